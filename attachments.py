@@ -0,0 +1,59 @@
+"""Module containing helpers for card images attached directly
+to their message, instead of linked from the cache channel.
+
+discord.py only uploads files when sending a message, so the
+attachment of a posted message is replaced with a multipart
+edit request of our own.
+"""
+
+import io
+import json
+
+
+PNG_SIGNATURE = b"\x89PNG"
+
+
+def get_image_type(image: bytes) -> str:
+    """Return the MIME type of a rendered card image, which is
+    either a PNG or a JPEG depending on the render backend.
+    """
+    return "image/png" if image.startswith(PNG_SIGNATURE) else "image/jpeg"
+
+
+def get_image_filename(image: bytes) -> str:
+    """Return the filename a rendered card image is uploaded as."""
+    return "card.png" if image.startswith(PNG_SIGNATURE) else "card.jpg"
+
+
+def get_image_file(image: bytes):
+    """Return a discord.File holding a rendered card image."""
+    import discord
+    return discord.File(io.BytesIO(image), filename=get_image_filename(image))
+
+
+def replace_attachment(http, channel_id: int, message_id: int, image: bytes, content: str = ""):
+    """Replace every attachment of a message with a rendered card
+    image and return the awaitable edit request. The request
+    resolves to the data of the edited message.
+    """
+    import aiohttp
+    from discord.http import Route
+
+    file = get_image_file(image)
+
+    form = aiohttp.FormData()
+    # An empty attachment list drops the previous image
+    form.add_field("payload_json", json.dumps({"content": content, "attachments": []}))
+    form.add_field("file", file.fp, filename=file.filename, content_type=get_image_type(image))
+
+    route = Route("PATCH", "/channels/{channel_id}/messages/{message_id}",
+                  channel_id=channel_id, message_id=message_id)
+
+    return http.request(route, data=form, files=[file])
+
+
+def get_attachment_url(message_data: dict) -> str:
+    """Return the url of the image attached to a message given
+    the data returned by the API.
+    """
+    return message_data["attachments"][0]["url"]
@@ -0,0 +1,211 @@
+"""Module containing the AvatarCache class. Downloads each
+participant's avatar once, downscales it to the size shown on
+the card and keeps it in a bounded memory tier backed by a
+disk tier, so that renders only ever read local images.
+"""
+
+from typing import Dict, Optional
+from collections import OrderedDict
+import asyncio
+import io
+import logging
+import os
+import threading
+import aiohttp
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+logger = logging.getLogger(__name__)
+
+
+CDN_URL = "https://cdn.discordapp.com"
+
+
+def get_cdn_size(size: int) -> int:
+    """Return the smallest size served by the CDN that
+    is at least size. The CDN only serves powers of two.
+    """
+    cdn_size = 16
+
+    while cdn_size < size and cdn_size < 4096:
+        cdn_size *= 2
+
+    return cdn_size
+
+
+class AvatarCache:
+    """A two tier cache of downscaled avatar images.
+
+    Images are keyed by user id, avatar hash and displayed size.
+
+    Instance Attributes:
+        - directory: the directory of the disk tier
+        - max_memory: the maximum number of images kept in memory
+        - base_url: the url of the avatar CDN
+    """
+    directory: str
+    max_memory: int
+    base_url: str
+
+    def __init__(self, directory: str, max_memory: int = 256, base_url: str = CDN_URL):
+        """Initialize the cache and index the disk tier"""
+
+        self.directory = directory
+        self.max_memory = max_memory
+        self.base_url = base_url.rstrip("/")
+
+        os.makedirs(directory, exist_ok=True)
+
+        # The memory tier is read by render workers
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._on_disk = set(os.path.join(directory, name) for name in os.listdir(directory)
+                            if name.endswith(".png"))
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def get_path(self, user_id: int, avatar: str, size: int) -> str:
+        """Return the disk tier path of an avatar."""
+        return os.path.join(self.directory, f"{user_id}_{avatar}_{size}.png")
+
+    def contains(self, path: str) -> bool:
+        """Return whether the avatar at path is cached locally."""
+        return path in self._memory or path in self._on_disk
+
+    def load(self, path: str) -> Optional[bytes]:
+        """Return the PNG bytes of a cached avatar, reading the
+        disk tier on a memory miss. Return None if it is not cached.
+        """
+
+        with self._lock:
+            if path in self._memory:
+                self._memory.move_to_end(path)
+                return self._memory[path]
+
+        if path not in self._on_disk:
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            self._on_disk.discard(path)
+            return None
+
+        self._remember(path, data)
+        return data
+
+    async def fetch(self, user_id: int, avatar: Optional[str], size: int) -> Optional[str]:
+        """Return the local path of an avatar, downloading it
+        if it is not cached. Return None if the user has no
+        avatar or the download failed.
+        """
+
+        if avatar is None:
+            return None
+
+        path = self.get_path(user_id, avatar, size)
+
+        if self.contains(path):
+            return path
+
+        # Share a single download between concurrent renders
+        if path not in self._pending:
+            self._pending[path] = asyncio.ensure_future(self._download(user_id, avatar, size, path))
+
+        try:
+            return await asyncio.shield(self._pending[path])
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            logger.warning("failed to fetch avatar", extra={"user": user_id, "error": repr(e)})
+            return None
+        finally:
+            self._pending.pop(path, None)
+
+    async def close(self) -> None:
+        """Close the HTTP session of the cache."""
+
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _download(self, user_id: int, avatar: str, size: int, path: str) -> str:
+        """(PRIVATE) Download, downscale and store an avatar."""
+
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+
+        url = f"{self.base_url}/avatars/{user_id}/{avatar}.png?size={get_cdn_size(size)}"
+
+        async with self._session.get(url) as response:
+            response.raise_for_status()
+            data = await response.read()
+
+        data = downscale(data, size)
+
+        # Write atomically so that renders never read a partial file
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+        self._remove_stale(user_id, path)
+        self._on_disk.add(path)
+        self._remember(path, data)
+
+        return path
+
+    def _remember(self, path: str, data: bytes) -> None:
+        """(PRIVATE) Store an image in the memory tier."""
+
+        with self._lock:
+            self._memory[path] = data
+            self._memory.move_to_end(path)
+
+            while len(self._memory) > self.max_memory:
+                self._memory.popitem(last=False)
+
+    def _remove_stale(self, user_id: int, path: str) -> None:
+        """(PRIVATE) Remove the cached images of a user's
+        previous avatars.
+        """
+
+        prefix = os.path.join(self.directory, f"{user_id}_")
+        size_suffix = path[path.rindex("_"):]
+
+        stale_paths = [p for p in self._on_disk
+                       if p != path and p.startswith(prefix) and p.endswith(size_suffix)]
+
+        for stale in stale_paths:
+            self._on_disk.discard(stale)
+
+            with self._lock:
+                self._memory.pop(stale, None)
+
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+
+def downscale(data: bytes, size: int) -> bytes:
+    """Return the PNG image in data resized to size x size.
+
+    The image is returned unchanged if Pillow is unavailable.
+    """
+
+    if Image is None:
+        return data
+
+    image = Image.open(io.BytesIO(data)).convert("RGBA")
+
+    if image.size != (size, size):
+        image = image.resize((size, size), Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+
+    return buffer.getvalue()
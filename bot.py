@@ -4,8 +4,8 @@ on discord.
 """
 
 
+import logging
 import global_vars as gv
-import datetime
 import discord
 
 # NEW (Experimental) Discord Features
@@ -14,47 +14,98 @@ from discord_slash import SlashCommand
 from discord_slash.model import SlashContext
 
 import card
+import metrics
 import rise_up
+import timezones
 
 
+metrics.configure_logging(gv.PROPERTIES.get("log_level", "INFO"), gv.PROPERTIES.get("log_path"))
+logger = logging.getLogger("bot")
+
 CLIENT = gv.CLIENT
 slash = SlashCommand(CLIENT)
 
+TIME_EXAMPLES = '5pm, 17:30, in 20m, tomorrow 9pm'
+
+
+def get_user_id(user) -> str:
+    """Return the id of a user given as a discord.Member or,
+    when members are not cached, as a bare id.
+    """
+    return str(getattr(user, "id", user))
+
+
+async def get_member(guild: discord.Guild, user) -> discord.Member:
+    """Return the discord.Member of a user given as a member or
+    as an id. Without a member cache it is fetched instead.
+    """
+
+    if isinstance(user, discord.Member):
+        return user
+
+    return guild.get_member(int(user)) or await guild.fetch_member(int(user))
+
 
 @CLIENT.event
 async def on_ready() -> None:
     """This function is run when the discord bot has connected to discord."""
 
-    print(f'{CLIENT.user} has connected to Discord!')
-    gv.CACHE_CHANNEL = CLIENT.get_channel(int(gv.PROPERTIES["cache_channel"]))
+    logger.info("connected to discord", extra={"user": str(CLIENT.user)})
+    cache_channel_id = int(gv.PROPERTIES["cache_channel"])
+
+    # The cache channel is not in the channel cache of processes not running its shard
+    gv.CACHE_CHANNEL = CLIENT.get_channel(cache_channel_id) or await CLIENT.fetch_channel(cache_channel_id)
+    gv.CACHE_COLLECTOR.start(gv.CACHE_CHANNEL)
+    await gv.METRICS_EXPORTER.start()
+
+    if not gv.READY:
+        restored = card.restore_cards()
+        logger.info("restored active rises", extra={"count": restored})
+
     gv.READY = True
 
     await CLIENT.change_presence(activity=discord.Activity(
         type=discord.ActivityType.listening, name="!rise up"))
 
 
+@CLIENT.event
+async def on_guild_available(guild: discord.Guild) -> None:
+    """This function restores the rises of a guild that was
+    unavailable when the bot connected.
+    """
+
+    if gv.READY:
+        restored = card.restore_cards(guild.id)
+
+        if restored:
+            logger.info("restored active rises", extra={"count": restored, "guild": guild.id})
+
+
 @slash.subcommand(base="rise", name="up")
 async def _rise_up(ctx: SlashContext, game_name: str, time_str: str, slots: int) -> None:
     """This function handles the !rise up command.
     """
 
     game = rise_up.get_game(game_name)
-    time = rise_up.get_datetime_from_time_str(time_str)
+    author_id = get_user_id(ctx.author)
+    tz = timezones.get_timezone(guild_id=ctx.guild.id, user_id=author_id)
+    parsed = rise_up.parse_time_str(time_str, tz)
 
-    if time is None:
-        await ctx.send(content='You did not specify a valid time. Try something like this: 5pm, 9:01am.')
+    if parsed.error is not None:
+        await ctx.send(content=f'{parsed.error} Try something like this: {TIME_EXAMPLES}.')
         return
 
-    author_id = str(ctx.author.id)
+    time = parsed.time
+    author = await get_member(ctx.guild, ctx.author)
 
     if author_id in gv.CARDS:
         # Card already exists
         # Delete Old Card
-        print("> User initiated a new card while an old card is still active! Closing previous card...")
+        logger.info("closing previous card of a new rise", extra={"author": author_id})
         await gv.CARDS[author_id].close()
 
     new_card = card.Card(
-        target_time=time, game=game, slots=slots, author=ctx.author, channel=ctx.channel, ctx=ctx)
+        target_time=time, game=game, slots=slots, author=author, channel=ctx.channel, ctx=ctx)
 
     await new_card.send()
 
@@ -65,19 +116,20 @@ async def _change_time(ctx: SlashContext, time_str: str) -> None:
     active rise.
     """
 
-    user_id = str(ctx.author.id)
-    time = rise_up.get_datetime_from_time_str(time_str)
+    user_id = get_user_id(ctx.author)
+    tz = timezones.get_timezone(guild_id=ctx.guild.id, user_id=user_id)
+    parsed = rise_up.parse_time_str(time_str, tz)
 
     if user_id in gv.CARDS:
-        if time is None:
-            await ctx.send(content='You did not specify a valid time.'
-                                   ' Try something like this: 5pm, 9:01am.')
+        if parsed.error is not None:
+            await ctx.send(content=f'{parsed.error} Try something like this: {TIME_EXAMPLES}.')
             return
         else:
+            time = parsed.time
             my_card = gv.CARDS[user_id]
 
             my_card.target_time = time
-            await my_card.update()
+            await my_card.updates.flush()
             await my_card.update_timers()
             await ctx.send(content=f'You have changed the time for the {my_card.game.name}'
                                    f'rise up to {rise_up.datetime_to_short_str(time)}.')
@@ -90,7 +142,7 @@ async def _change_time(ctx: SlashContext, time_str: str) -> None:
 async def _cancel(ctx: SlashContext) -> None:
     """This function handles canceling an active rise.
     """
-    user_id = str(ctx.author.id)
+    user_id = get_user_id(ctx.author)
 
     if user_id in gv.CARDS:
         await gv.CARDS[user_id].delete()
@@ -102,7 +154,7 @@ async def _cancel(ctx: SlashContext) -> None:
 async def _close(ctx: SlashContext) -> None:
     """This function handles closing an active rise.
     """
-    user_id = str(ctx.author.id)
+    user_id = get_user_id(ctx.author)
 
     if user_id in gv.CARDS:
         await gv.CARDS[user_id].close()
@@ -131,21 +183,67 @@ async def _force_setup(ctx: SlashContext) -> None:
         rise_up_channel = await guild.create_text_channel("rise-ups")
 
     # Save Data
-    gv.GUILD_DATA[str(guild.id)] = {"rise_up_channel": int(rise_up_channel.id)}
-    gv.save_to_json(gv.GUILD_DATA, "guild_data.json")
+    gv.GUILD_CONFIG.update(guild.id, rise_up_channel=int(rise_up_channel.id))
 
     await ctx.send(content='The bot has successfully setup.')
 
 
+@slash.subcommand(base="timezone", name="set")
+async def _timezone_set(ctx: SlashContext, zone: str) -> None:
+    """This function handles setting the timezone a user's
+    rise times are given in.
+    """
+
+    if not timezones.is_valid_zone(zone):
+        await ctx.send(content=f'{zone} is not a timezone I know. Try something like this: America/Toronto.')
+        return
+
+    gv.USER_CONFIG.update(get_user_id(ctx.author), timezone=zone)
+
+    await ctx.send(content=f'Your rise times are now in {zone}.')
+
+
+@slash.subcommand(base="timezone", name="server")
+async def _timezone_server(ctx: SlashContext, zone: str) -> None:
+    """This function handles setting the default timezone
+    of a guild.
+    """
+
+    author = await get_member(ctx.guild, ctx.author)
+
+    if not author.guild_permissions.manage_guild:
+        await ctx.send(content='You need the Manage Server permission to do that.')
+        return
+
+    if not timezones.is_valid_zone(zone):
+        await ctx.send(content=f'{zone} is not a timezone I know. Try something like this: America/Toronto.')
+        return
+
+    gv.GUILD_CONFIG.update(ctx.guild.id, timezone=zone)
+
+    await ctx.send(content=f'Rise times in this server are now in {zone}, unless a user has set their own.')
+
+
+@slash.subcommand(base="timezone", name="show")
+async def _timezone_show(ctx: SlashContext) -> None:
+    """This function handles showing the timezone a user's
+    rise times are given in.
+    """
+
+    tz = timezones.get_timezone(guild_id=ctx.guild.id, user_id=get_user_id(ctx.author))
+
+    await ctx.send(content=f'Your rise times are in {timezones.get_zone_name(tz)}.')
+
+
 @slash.slash(name="usurp")
 async def _usurp(ctx: SlashContext, user: discord.Member) -> None:
     """This function handles usurping an active rise.
     """
-    user_id = str(user.id)
+    user_id = get_user_id(user)
 
     if user_id in gv.CARDS:
         my_card = gv.CARDS[user_id]
-        my_card.change_author(user)
+        my_card.change_author(await get_member(ctx.guild, user))
 
         await ctx.send(content=f'You have successfully stolen a rise from <@{user_id}>')
 
@@ -158,14 +256,14 @@ async def _give(ctx: SlashContext, user: discord.Member) -> None:
     """This function handles giving a rise to another user.
     """
 
-    user_id = str(user.id)
-    author_id = str(ctx.author.id)
+    user_id = get_user_id(user)
+    author_id = get_user_id(ctx.author)
 
     if user_id in gv.CARDS:
         await ctx.send(content='The target user already has a rise!')
     elif author_id in gv.CARDS:
         my_card = gv.CARDS[author_id]
-        my_card.change_author(user)
+        my_card.change_author(await get_member(ctx.guild, user))
 
         await ctx.send(content=f'You have successfully given your rise to <@{user_id}>')
     else:
@@ -173,142 +271,80 @@ async def _give(ctx: SlashContext, user: discord.Member) -> None:
 
 
 @CLIENT.event
-async def on_reaction_add(reaction, user):
-    """This function handles reaction adding to rise up commands."""
-    
-    if not gv.READY:
-        return
-
-    if user.bot:
-        return
+async def on_message(message):
+    """This function hands messages posted by the bot to the
+    rises waiting for them.
+    """
 
-    message_id = str(reaction.message.id)
+    if message.author.id == CLIENT.user.id:
+        gv.PENDING_MESSAGES.resolve(message)
 
-    if message_id not in gv.CARD_MESSAGES:
-        return
-
-    if reaction.emoji == "✅":
-        status = "Available"
-    elif reaction.emoji == "🍴":
-        status = "Eating"
-    else:
-        return
 
-    user_id = str(user.id)
+@CLIENT.event
+@metrics.REACTION_EVENT_SECONDS.labels("add").time()
+async def on_raw_reaction_add(payload):
+    """This function handles reaction adding to rise up commands.
 
-    # CASE 1: User Reacts but has already selected another option in the same message
-    root_alt_reaction = None
+    Raw events are used so that messages of restored rises,
+    which are not in the message cache, are handled too.
+    """
 
-    author_id = gv.CARD_MESSAGES[message_id]
-    gv.CARDS[author_id].players[user_id] = user
+    if not gv.READY:
+        return
 
-    for r in reaction.message.reactions:
-        if r.emoji != reaction.emoji:
-            root_alt_reaction = r
-            break
+    user = payload.member
 
-    async for u in root_alt_reaction.users():
-        if user_id == str(u.id):
-            # Delete Other Reaction
-            await root_alt_reaction.remove(u)
-            break
+    if user is None or user.bot:
+        return
 
-    # CASE 2: User Reacts but has already selected another option in a forwarded message
-    if gv.CARDS[author_id].forwarded_message is not None:
-        # Reacted on Source Message
+    message_id = str(payload.message_id)
 
-        if str(gv.CARDS[author_id].message.id) == message_id:
-            # Refresh Message Cache
-            gv.CARDS[author_id].forwarded_message = await gv.refresh_message(gv.CARDS[author_id].forwarded_message)
-            reactions = gv.CARDS[author_id].forwarded_message.reactions
-        else:
-            gv.CARDS[author_id].message = await gv.refresh_message(gv.CARDS[author_id].message)
-            reactions = gv.CARDS[author_id].message.reactions
+    if message_id not in gv.CARD_MESSAGES:
+        return
 
-        terminate = False
+    emoji = str(payload.emoji)
 
-        for r in reactions:
-            async for u in r.users():
-                if user_id == str(u.id):
-                    # Delete Other Reaction
-                    await r.remove(u)
-                    terminate = True
-                    break
+    if emoji not in card.REACTION_STATUSES:
+        return
 
-            if terminate:
-                break
+    author_id = gv.CARD_MESSAGES[message_id]
+    my_card = gv.CARDS[author_id]
 
-    if user_id not in gv.CARDS[author_id].players_availability_type:
-        gv.CARDS[author_id].players_availability_type[user_id] \
-            = card.AvailabilityType(datetime.datetime.now(), status)
-    else:
-        gv.CARDS[author_id].players_availability_type[user_id].status = status
+    # User Reacts but has already selected another option in the same or forwarded message
+    for message, other_emoji in my_card.add_reaction(user, payload.message_id, emoji):
+        # Delete Other Reaction
+        await message.remove_reaction(other_emoji, user)
 
-    await gv.CARDS[author_id].update()
+    my_card.schedule_update()
 
 
 @CLIENT.event
-async def on_reaction_remove(reaction, user):
+@metrics.REACTION_EVENT_SECONDS.labels("remove").time()
+async def on_raw_reaction_remove(payload):
     """This function handles reaction removing to rise up commands."""
-    
-    if not gv.READY:
-        return
 
-    if user.bot:
+    if not gv.READY:
         return
 
-    message_id = str(reaction.message.id)
+    message_id = str(payload.message_id)
 
     if message_id not in gv.CARD_MESSAGES:
         return
 
-    if not (reaction.emoji == "✅" or reaction.emoji == "🍴"):
-        return
-
-    user_id = str(user.id)
+    emoji = str(payload.emoji)
 
-    # Check if user reacted to other emoticon
-    other_reaction = None
-    reacted_to_other = False
+    if emoji not in card.REACTION_STATUSES:
+        return
 
+    user_id = str(payload.user_id)
     author_id = gv.CARD_MESSAGES[message_id]
+    my_card = gv.CARDS[author_id]
 
-    for r in reaction.message.reactions:
-        if r.emoji != reaction.emoji:
-            other_reaction = r
-            break
-
-    async for u in other_reaction.users():
-        if user_id == str(u.id):
-            reacted_to_other = True
-            break
-
-    if not reacted_to_other and gv.CARDS[author_id].forwarded_message is not None:
-        # Reacted on Source Message
-
-        if str(gv.CARDS[author_id].message.id) == message_id:
-            # Refresh Message Cache
-            gv.CARDS[author_id].forwarded_message = await gv.refresh_message(gv.CARDS[author_id].forwarded_message)
-            reactions = gv.CARDS[author_id].forwarded_message.reactions
-        else:
-            gv.CARDS[author_id].message = await gv.refresh_message(gv.CARDS[author_id].message)
-            reactions = gv.CARDS[author_id].message.reactions
-
-        for r in reactions:
-            async for u in r.users():
-                if user_id == str(u.id):
-                    # Delete Other Reaction
-                    reacted_to_other = True
-                    break
-
-            if reacted_to_other:
-                break
-
-    if not reacted_to_other:
-        del gv.CARDS[author_id].players[user_id]
-        print(f"{user_id} removed reaction message...")
+    # Reactions removed by the bot or replaced by another option are ignored
+    if my_card.remove_reaction(user_id, payload.message_id, emoji):
+        logger.debug("reaction removed", extra={"user": user_id})
 
-        await gv.CARDS[author_id].update()
+        my_card.schedule_update()
 
 
 CLIENT.run(gv.PROPERTIES["token"])
@@ -0,0 +1,142 @@
+"""Module containing the CacheCollector class. Gathers expired
+cache channel messages and deletes them in bulk, one pass per
+interval. Pending deletions are stored on disk so that images
+are still cleaned up after a restart.
+"""
+
+from typing import Dict, List, Optional
+import json
+import logging
+import os
+import time
+import discord
+import global_vars as gv
+
+
+logger = logging.getLogger(__name__)
+
+
+# Discord only bulk deletes messages younger than two weeks
+BULK_DELETE_MAX_AGE = 14 * 24 * 60 * 60 - 60 * 60
+BULK_DELETE_MAX_COUNT = 100
+DISCORD_EPOCH = 1420070400
+
+
+def get_message_age(message_id: int) -> float:
+    """Return the age in seconds of a message given its id."""
+    return time.time() - ((message_id >> 22) / 1000 + DISCORD_EPOCH)
+
+
+class CacheCollector:
+    """A garbage collector for messages in the cache channel.
+
+    Instance Attributes:
+        - path: the file storing the pending deletions
+        - delay: seconds a message is kept after being released
+        - interval: seconds between two collection passes
+        - channel: the cache channel, set once the bot is ready
+    """
+    path: str
+    delay: float
+    interval: float
+    channel: Optional[discord.TextChannel]
+
+    def __init__(self, path: str, delay: float = 60, interval: float = 60):
+        """Initialize the collector and load the pending deletions"""
+
+        self.path = path
+        self.delay = delay
+        self.interval = interval
+        self.channel = None
+
+        self._timer = None
+        self._pending: Dict[int, float] = {}
+
+        if os.path.isfile(path):
+            with open(path, "r") as f:
+                self._pending = {int(key): expiry for key, expiry in json.load(f).items()}
+
+    def __len__(self) -> int:
+        """Return the number of messages awaiting deletion."""
+        return len(self._pending)
+
+    def add(self, message) -> None:
+        """Delete a cache message once delay seconds have passed."""
+
+        self._pending[message.id] = time.time() + self.delay
+        self._save()
+
+    def start(self, channel: discord.TextChannel) -> None:
+        """Start collecting from the cache channel. Messages left
+        over from a previous run are deleted in the first pass.
+        """
+
+        self.channel = channel
+
+        if self._timer is None:
+            self._timer = gv.Timer(self.interval, self.collect)
+
+    async def collect(self) -> None:
+        """Delete every expired message in a single pass and
+        schedule the next pass.
+        """
+
+        try:
+            await self._collect()
+        finally:
+            self._timer.reschedule(self.interval)
+
+    async def _collect(self) -> None:
+        """(PRIVATE) Delete every expired message."""
+
+        now = time.time()
+        expired = [message_id for message_id, expiry in self._pending.items() if expiry <= now]
+
+        if not expired or self.channel is None:
+            return
+
+        recent = [message_id for message_id in expired if get_message_age(message_id) < BULK_DELETE_MAX_AGE]
+        old = [message_id for message_id in expired if get_message_age(message_id) >= BULK_DELETE_MAX_AGE]
+
+        logger.debug("collecting cache messages", extra={"count": len(expired)})
+
+        deleted: List[int] = []
+
+        for i in range(0, len(recent), BULK_DELETE_MAX_COUNT):
+            chunk = recent[i:i + BULK_DELETE_MAX_COUNT]
+
+            try:
+                await self.channel.delete_messages([discord.Object(id=message_id) for message_id in chunk])
+            except discord.NotFound:
+                pass
+            except discord.HTTPException as e:
+                logger.warning("failed to bulk delete cache messages", extra={"error": repr(e)})
+                continue
+
+            deleted += chunk
+
+        for message_id in old:
+            try:
+                await gv.CLIENT.http.delete_message(self.channel.id, message_id)
+            except discord.NotFound:
+                pass
+            except discord.HTTPException as e:
+                logger.warning("failed to delete cache message", extra={"error": repr(e)})
+                continue
+
+            deleted.append(message_id)
+
+        for message_id in deleted:
+            del self._pending[message_id]
+
+        self._save()
+
+    def _save(self) -> None:
+        """(PRIVATE) Atomically store the pending deletions."""
+
+        temp_path = self.path + ".tmp"
+
+        with open(temp_path, "w") as f:
+            json.dump({str(key): expiry for key, expiry in self._pending.items()}, f)
+
+        os.replace(temp_path, self.path)
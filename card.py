@@ -3,32 +3,64 @@ for representing a rise up card and handling its
 creation, interaction, and deletion.
 """
 
-from typing import List
-from functools import cmp_to_key
-from dataclasses import dataclass
-import discord
-import imgkit
+from __future__ import annotations
+from typing import TYPE_CHECKING, List, Optional
+import asyncio
+import logging
 from rise_up import *
+from renderer import CardData, PlayerData, AVATAR_SIZE, PLAYER_AVATAR_SIZE
+from update_scheduler import UpdateScheduler
+from render_cache import RenderCache, get_card_digest
+from rise_store import StoredCard, StoredUser, PartialMessage
+from participant import Participant
+from publish import Publication
+from reminders import get_reminder_offsets, format_offset, chunk_mentions
+from attachments import get_image_file, replace_attachment, get_attachment_url
+from timezones import get_timezone
 import global_vars as gv
+import metrics
 
+if TYPE_CHECKING:
+    import discord
 
-async def delete_message(message):
-    await message.delete()
 
+# Where card images are kept: attached to the card's message, or
+# uploaded to the cache channel and linked from the card's message
+ATTACHMENT_MODE = "attachment"
+CACHE_CHANNEL_MODE = "cache_channel"
 
-def get_avatar_url(user) -> str:
+logger = logging.getLogger(__name__)
+
+# Statuses represented by the card reactions
+REACTION_STATUSES = {
+    "\u2705": "Available",
+    "\U0001F374": "Eating"
+}
+
+
+def schedule_cache_deletion(message):
+    """Hand a cache message to the cache collector for deletion."""
+    gv.CACHE_COLLECTOR.add(message)
+
+
+def get_avatar_url(user_id: int, avatar: Optional[str]) -> str:
     """Return a url for the avatar image of a given user."""
 
-    return "https://cdn.discordapp.com/avatars/{0.id}/{0.avatar}.png?size=1024".format(user)
+    return f"https://cdn.discordapp.com/avatars/{user_id}/{avatar}.png?size=1024"
 
 
-@dataclass
-class AvailabilityType:
-    """A class containing information regarding the availability
-    of a participant: when they registered and their status.
+def get_avatar_path(user_id: int, avatar: Optional[str], size: int) -> str:
+    """Return the local path of the avatar image of a given
+    user if it is cached, and its url otherwise.
     """
-    time: datetime.datetime
-    status: str
+
+    if avatar is not None:
+        path = gv.AVATARS.get_path(user_id, avatar, size)
+
+        if gv.AVATARS.contains(path):
+            return path
+
+    return get_avatar_url(user_id, avatar)
 
 
 class Card:
@@ -59,149 +91,332 @@ class Card:
         self.author = author
         self.channel = channel
 
+        # Dict mapping user ids to their Participant, in the order they joined
         self.players = {}
-        self.players_availability_type = {}
+
+        # Dict mapping user ids to their reactions ({message id: emoji}) on the card
+        self.reactions = {}
 
         self.message = None
         self.cache_message = None
         self.forwarded_message = None
 
+        # Seconds before the rise of each reminder, earliest first, and the next one to send
+        self.reminder_offsets = get_reminder_offsets(gv.PROPERTIES)
+        self.next_reminder = 0
+
+        # Uploaded images of recent card states and the digest on display
+        self.render_cache = RenderCache(int(gv.PROPERTIES.get("render_cache_size", 8)),
+                                        on_evict=schedule_cache_deletion)
+        self.card_digest = None
+        self.image_mode = gv.PROPERTIES.get("image_mode", ATTACHMENT_MODE)
+
         self.guild = self.channel.guild
 
+        # Coalesces bursts of reactions into a single update
+        self.updates = UpdateScheduler(
+            self.update,
+            quiet_window=float(gv.PROPERTIES.get("update_quiet_window", 1.0)),
+            min_interval=float(gv.PROPERTIES.get("update_min_interval", 2.0)),
+            max_delay=float(gv.PROPERTIES.get("update_max_delay", 5.0)))
+
         # =====================================================
         # INITIALIZE TIMERS
         # =====================================================
 
         target_time_seconds = get_time_until(self.target_time)
-        print(f"> Creating Notification Timer (Execution in {target_time_seconds}s)")
-        self.notification_timer = gv.Timer(target_time_seconds, self.notify)
+        self.skip_missed_reminders()
+        reminder_seconds = get_time_until(self.get_reminder_time())
+        logger.debug("creating notification timer", extra={"seconds": reminder_seconds})
+        self.notification_timer = gv.Timer(reminder_seconds, self.notify)
 
         delete_time_seconds = target_time_seconds + int(gv.PROPERTIES["close_rise_delay"])
         self.delete_timer = gv.Timer(delete_time_seconds, self.close)
 
-    def render_to_file(self, path: str = 'card.png'):
-        """Render the Card from the HTML template into
-        an image. Store the image into the given path.
+        self.reconcile_timer = gv.Timer(int(gv.PROPERTIES.get("reaction_reconcile_interval", 900)),
+                                        self.reconcile_reactions)
+
+    def get_card_data(self) -> CardData:
+        """Return a snapshot of everything drawn on the card."""
+
+        players = tuple(
+            PlayerData(name=player.name,
+                       avatar=get_avatar_path(player.user_id, player.avatar, PLAYER_AVATAR_SIZE),
+                       status=player.status)
+            for player in self.players.values()
+        )
+
+        return CardData(author_name=self.author.name,
+                        author_avatar=get_avatar_path(self.author.id, self.author.avatar, AVATAR_SIZE),
+                        game_name=self.game.name,
+                        game_img=self.game.img_path,
+                        time_str=datetime_to_short_str(self.target_time),
+                        slots=self.slots,
+                        players=players)
+
+    async def fetch_avatars(self):
+        """Fetch the avatars of the author and the players
+        into the local avatar cache.
         """
 
-        my_html = open("sample.html", "r").read()
-        players = self.get_sorted_players()
+        fetches = [gv.AVATARS.fetch(self.author.id, self.author.avatar, AVATAR_SIZE)]
+        fetches += [gv.AVATARS.fetch(player.user_id, player.avatar, PLAYER_AVATAR_SIZE)
+                    for player in self.players.values()]
 
-        # Add Initiator User Information
-        my_html = my_html.replace("|sender_name|", self.author.name)
-        my_html = my_html.replace("|sender_img|", get_avatar_url(self.author))
+        await asyncio.gather(*fetches)
 
-        # Add Game Information
-        my_html = my_html.replace("|game_name|", self.game.name)
-        my_html = my_html.replace("|game_time|",
-                                  datetime_to_short_str(self.target_time))
-        my_html = my_html.replace("|game_img|", self.game.img_path)
-
-        # Add Slot Information
-        my_html = my_html.replace("|player_count|", str(len(players)))
-        my_html = my_html.replace("|slots|", str(self.slots))
-
-        # Add New Users
-        template_available = "<div class='player'><img src='|player_image|' " \
-                             "class='player-image'><p class='player-name'>|player_name|</p></div>"
-        template_eating = "<div class='player'><img src='|player_image|' " \
-                          "class='player-image'><p class='player-name'>" \
-                          "|player_name|</p><img src='assets/fork.png' " \
-                          "class='small-eating-icon'></div>"
-        to_add = ""
-
-        for player in players:
-            player_id = str(player.id)
-            status = self.players_availability_type[player_id].status
-
-            player_html = ""
-
-            if status == "Available":
-                player_html = template_available.replace("|player_image|", get_avatar_url(player))
-            elif status == "Eating":
-                player_html = template_eating.replace("|player_image|", get_avatar_url(player))
+    async def upload(self, data: CardData) -> str:
+        """Return the url of the image of the card described
+        by data. The image is only rendered and sent to the
+        cache channel if the state was not uploaded recently.
+        """
 
-            player_html = player_html.replace("|player_name|", player.name)
+        digest = get_card_digest(data)
+        cache_message = self.render_cache.get(digest)
 
-            to_add += player_html
+        if cache_message is None:
+            # Render off the event loop. A newer state may be rendered instead.
+            data, image = await gv.RENDER_POOL.render(id(self), data)
+            digest = get_card_digest(data)
 
-        my_html = my_html.replace("|player_list|", to_add)
+            # Send New Cache Message
+            with metrics.UPLOAD_SECONDS.labels(CACHE_CHANNEL_MODE).time():
+                cache_message = await gv.CACHE_CHANNEL.send(file=get_image_file(image))
+            self.render_cache.put(digest, cache_message)
 
-        options = {
-            "format": "png",
-            "disable-smart-width": "",
-            "width": 400,
-            "quiet": "",
-            "enable-local-file-access": None
-        }
+            # The image is kept past a restart, to be reused or deleted then
+            if self.message is not None:
+                gv.STORE.save_cache_images(self)
 
-        # Send MY_HTML to file for asset context
-        with open("card.html", "w") as f:
-            f.write(my_html)
+        self.cache_message = cache_message
+        self.card_digest = digest
 
-        imgkit.from_file("card.html", path, config=gv.IMGKIT_CONFIG, options=options)
+        return cache_message.attachments[0].url
 
     async def send(self):
         """Send the Card to the cache, target, and forwarding (rise up)
         channel and update the global variables.
         """
 
-        print("> Rise initiated by ", self.author.name)
-        self.render_to_file()
+        logger.info("rise initiated", extra={"author": self.author.id})
 
-        # Send New Cache Message
-        self.cache_message = await gv.CACHE_CHANNEL.send(file=discord.File("card.png"))
-        url = self.cache_message.attachments[0].url
+        await self.fetch_avatars()
+        data = self.get_card_data()
 
-        # Send Message to Target Channel
-        await self.ctx.send(content=str(url))
-        async for message in self.channel.history():
-            if message.author == gv.CLIENT.user:
-                self.message = message
-                break
+        # Attached images have no url until the card is posted
+        url = None if self.image_mode == ATTACHMENT_MODE else await self.upload(data)
 
-        guild_id = str(self.guild.id)
         author_id = str(self.author.id)
+        posted = asyncio.Event()
 
-        # Add Card to the Global Variables
-        gv.CARD_MESSAGES[str(self.message.id)] = author_id
-        gv.CARDS[author_id] = self
+        async def post_card():
+            nonlocal url
+
+            try:
+                if url is None:
+                    self.message, url = await self.post_attachment(data)
+                else:
+                    self.message = await self.post_response(url)
+            finally:
+                posted.set()
+
+            # Add Card to the Global Variables
+            gv.CARD_MESSAGES[str(self.message.id)] = author_id
+            gv.CARDS[author_id] = self
+            gv.STORE.save_card(self)
+            gv.STORE.save_cache_images(self)
+
+        async def forward_card(rise_up_channel):
+            # The forward links to the image attached to the card. In the
+            # card's own channel, it would also be taken for the card's
+            # response, which is matched by its channel and content.
+            if url is None or rise_up_channel.id == self.channel.id:
+                await posted.wait()
+
+                if self.message is None:
+                    return
+
+            forwarded_message = await rise_up_channel.send(url)
+
+            for emoji in REACTION_STATUSES:
+                await forwarded_message.add_reaction(emoji)
+
+            # The card is stored under the id of its own message
+            await posted.wait()
+
+            if self.message is None:
+                await forwarded_message.delete()
+                return
+
+            self.forwarded_message = forwarded_message
+            gv.CARD_MESSAGES[str(forwarded_message.id)] = author_id
+            gv.STORE.save_card(self)
+
+        # The card is posted and forwarded concurrently, each message
+        # getting its reactions once it exists
+        publication = Publication()
+        publication.add("message", "post card", post_card)
+
+        for emoji in REACTION_STATUSES:
+            publication.add("message", f"add {emoji} to card",
+                            lambda emoji=emoji: self.message.add_reaction(emoji))
 
         # Duplicate and Forward Message to Rise Up Channel
-        if guild_id not in gv.GUILD_DATA:
+        guild_config = gv.GUILD_CONFIG.get(str(self.guild.id))
+
+        # A guild may have set its timezone without setting up a channel
+        if guild_config is None or guild_config.get("rise_up_channel") is None:
             error_message = "The bot was not setup to forward rise up cards " \
                             "to a preset channel. To force a setup, try !force setup"
 
-            await self.channel.send(error_message)
+            publication.add("forward", "warn about setup", lambda: self.channel.send(error_message))
         else:
-            rise_up_channel_id = int(gv.GUILD_DATA[guild_id]["rise_up_channel"])
-            rise_up_channel = gv.CLIENT.get_channel(rise_up_channel_id)
+            rise_up_channel = gv.CLIENT.get_channel(int(guild_config["rise_up_channel"]))
+            publication.add("forward", "forward card", lambda: forward_card(rise_up_channel))
+
+        failures = await publication.run()
+
+        for failure in failures:
+            if self.message is None and failure.description == "post card":
+                # The card never existed, so nothing may remind or reconcile it
+                await self.updates.stop()
+                self.notification_timer.delete()
+                self.delete_timer.delete()
+                self.reconcile_timer.delete()
+
+                for cache_message in self.render_cache.clear():
+                    schedule_cache_deletion(cache_message)
+
+                raise failure.error
+
+            logger.warning("failed to publish card", extra=failure.get_fields())
+
+    async def post_attachment(self, data: CardData):
+        """Acknowledge the command and post the card with its image
+        attached. Return the posted message and the url of its image.
+
+        If the image can not be attached, the card is posted through
+        the cache channel instead.
+        """
+        import discord
+
+        # The acknowledgement shows the command without a reply, and is sent while rendering
+        _, (data, image) = await asyncio.gather(
+            self.ctx.send(send_type=5), gv.RENDER_POOL.render(id(self), data))
+
+        try:
+            with metrics.UPLOAD_SECONDS.labels(ATTACHMENT_MODE).time():
+                message = await self.channel.send(file=get_image_file(image))
+        except discord.HTTPException as e:
+            logger.warning("failed to attach card image, using the cache channel", extra={"error": repr(e)})
+            self.image_mode = CACHE_CHANNEL_MODE
+
+            url = await self.upload(data)
+            return await self.post_response(url), url
+
+        self.card_digest = get_card_digest(data)
+
+        return message, message.attachments[0].url
+
+    async def attach(self, data: CardData) -> str:
+        """Replace the image attached to the card's message with
+        the image of data and return the url of the new image.
+        """
 
-            self.forwarded_message = await rise_up_channel.send(url)
+        # Render off the event loop. A newer state may be rendered instead.
+        data, image = await gv.RENDER_POOL.render(id(self), data)
 
-            await self.forwarded_message.add_reaction("\u2705")
-            await self.forwarded_message.add_reaction(u"\U0001F374")
+        with metrics.UPLOAD_SECONDS.labels(ATTACHMENT_MODE).time():
+            message_data = await replace_attachment(gv.CLIENT.http, self.message.channel.id, self.message.id, image)
+        self.card_digest = get_card_digest(data)
 
-            gv.CARD_MESSAGES[str(self.forwarded_message.id)] = author_id
+        return get_attachment_url(message_data)
 
-        await self.message.add_reaction("\u2705")
-        await self.message.add_reaction(u"\U0001F374")
+    def edit_card_text(self, content: str):
+        """Return the request replacing the card's message with
+        text, dropping an attached image.
+        """
+        return gv.CLIENT.http.edit_message(self.message.channel.id, self.message.id,
+                                           content=content, attachments=[])
+
+    async def post_response(self, url: str):
+        """Reply to the command with the card image and return
+        the posted message.
+        """
+
+        # The response returns no message, so it is taken from the gateway event announcing it
+        gv.PENDING_MESSAGES.expect(self.channel.id, url)
+
+        try:
+            await self.ctx.send(content=str(url))
+        except Exception:
+            gv.PENDING_MESSAGES.discard(self.channel.id, url)
+            raise
+
+        message = await gv.PENDING_MESSAGES.wait(
+            self.channel.id, url, float(gv.PROPERTIES.get("message_event_timeout", 5)))
+
+        if message is None:
+            logger.warning("posted card was not announced in time, searching recent messages")
+            message = await self.find_posted_message(url)
+
+        return message
+
+    async def find_posted_message(self, content: str):
+        """Return the recent message of the bot in the card's
+        channel with the given content.
+        """
+
+        async for message in self.channel.history(limit=20):
+            if message.author == gv.CLIENT.user and message.content == content:
+                return message
+
+        raise LookupError("The posted card message could not be found")
 
     async def update(self):
         """Re-render card images and edit rise up messages."""
 
-        # Delete the old cached message after 60s
-        timer = gv.Timer(60, delete_message, [self.cache_message])
-        self.render_to_file()
+        await self.fetch_avatars()
+        data = self.get_card_data()
 
-        # Send New Cache Message
-        self.cache_message = await gv.CACHE_CHANNEL.send(file=discord.File('card.png'))
-        image_url = self.cache_message.attachments[0].url
+        # Skip the update if the visible state has not changed
+        if get_card_digest(data) == self.card_digest:
+            return
 
-        await self.message.edit(content=image_url)
+        messages = self.get_messages()
 
-        if self.forwarded_message is not None:
-            await self.forwarded_message.edit(content=image_url)
+        if self.image_mode == ATTACHMENT_MODE:
+            import discord
+
+            try:
+                image_url = await self.attach(data)
+            except discord.HTTPException as e:
+                logger.warning("failed to attach card image, using the cache channel", extra={"error": repr(e)})
+                self.image_mode = CACHE_CHANNEL_MODE
+
+                image_url = await self.upload(data)
+                await self.edit_card_text(image_url)
+
+            # Only the forward links to the image
+            messages.remove(self.message)
+        else:
+            image_url = await self.upload(data)
+
+        publication = Publication()
+
+        for message in messages:
+            publication.add(message.id, "edit card", lambda message=message: message.edit(content=image_url))
+
+        for failure in await publication.run():
+            logger.warning("failed to update card", extra=failure.get_fields())
+
+        metrics.CARD_UPDATES.inc()
+
+    def schedule_update(self):
+        """Request a debounced update of the card. Bursts of
+        requests are published as a single render and edit.
+        """
+        self.updates.request()
 
     def change_author(self, author: discord.Member):
         """Change the author of the rise and update gv.CARDS
@@ -213,70 +428,298 @@ class Card:
         del gv.CARDS[old_author_id]
         gv.CARDS[author_id] = self
 
-        gv.CARD_MESSAGES[str(self.message.id)] = author_id
-        gv.CARD_MESSAGES[str(self.forwarded_message.id)] = author_id
+        for message in self.get_messages():
+            gv.CARD_MESSAGES[str(message.id)] = author_id
 
         self.author = author
-        self.update()
+        gv.STORE.save_card(self)
+        self.schedule_update()
+
+    def get_messages(self) -> List[discord.Message]:
+        """Return the messages displaying the card"""
+        return [m for m in (self.message, self.forwarded_message) if m is not None]
+
+    def add_reaction(self, user, message_id: int, emoji: str) -> List[tuple]:
+        """Record a reaction of a user to one of the card's messages
+        and update their status.
+
+        Return the (message, emoji) pairs of the user's other reactions
+        on the card. They are dropped from the index and must be
+        removed from Discord.
+        """
+
+        user_id = str(user.id)
+        messages = {m.id: m for m in self.get_messages()}
+
+        stale = [(messages[other_id], other_emoji)
+                 for other_id, other_emoji in self.reactions.get(user_id, {}).items()
+                 if (other_id, other_emoji) != (message_id, emoji) and other_id in messages]
+
+        self.reactions[user_id] = {message_id: emoji}
+        self._set_status(user, REACTION_STATUSES[emoji])
+        gv.STORE.save_player(self, user_id)
+
+        return stale
+
+    def _set_status(self, user, status: str):
+        """(PRIVATE) Add a user to the players with the given status,
+        or update their status if they already joined.
+        """
+
+        user_id = str(user.id)
+        player = self.players.get(user_id)
+
+        if player is None:
+            self.players[user_id] = Participant.from_user(user, status)
+        else:
+            player.update(user, status)
+
+    def remove_reaction(self, user_id: str, message_id: int, emoji: str) -> bool:
+        """Forget a reaction of a user to one of the card's messages.
+
+        Return whether the user no longer reacts to the card and
+        was removed from the players. Reactions the bot removed
+        itself are already absent from the index.
+        """
+
+        reactions = self.reactions.get(user_id)
+
+        if reactions is None or reactions.get(message_id) != emoji:
+            return False
+
+        del reactions[message_id]
+
+        if reactions:
+            gv.STORE.save_player(self, user_id)
+            return False
+
+        del self.reactions[user_id]
+        self.players.pop(user_id, None)
+        gv.STORE.delete_player(self, user_id)
+
+        return True
+
+    def is_active(self) -> bool:
+        """Return whether the card is still the active rise of its
+        author, and not closed or deleted.
+        """
+        return gv.CARDS.get(str(self.author.id)) is self
+
+    async def reconcile_reactions(self):
+        """Rebuild the reaction index from the card's messages.
+
+        Reactions missed while the bot was offline or disconnected
+        are picked up here. This is the only place where reactions
+        are read from the API.
+        """
+        import discord
+
+        self.reconcile_timer.reschedule(int(gv.PROPERTIES.get("reaction_reconcile_interval", 900)))
+
+        reactions = {}
+        users = {}
+
+        for message in self.get_messages():
+            try:
+                message = await gv.refresh_message(message)
+            except discord.NotFound:
+                if message is self.message:
+                    # The card was deleted by hand, which ends the rise
+                    logger.info("card message was deleted, deleting rise", extra={"author": self.author.id})
+                    await self.delete()
+                    return
+
+                # The forward was deleted by hand, the card is still shown in its channel
+                logger.info("forwarded card was deleted", extra={"author": self.author.id})
+                gv.CARD_MESSAGES.pop(str(message.id), None)
+                self.forwarded_message = None
+                gv.STORE.save_card(self)
+                continue
+
+            for reaction in message.reactions:
+                if reaction.emoji not in REACTION_STATUSES:
+                    continue
+
+                async for user in reaction.users():
+                    if user.bot:
+                        continue
+
+                    user_id = str(user.id)
+                    users[user_id] = user
+                    reactions.setdefault(user_id, {})[message.id] = reaction.emoji
+
+                # The card may have been closed or deleted while paging
+                if not self.is_active():
+                    return
+
+            if not self.is_active():
+                return
+
+        if reactions == self.reactions:
+            return
+
+        logger.info("reconciled reactions", extra={"author": self.author.id})
+
+        for user_id in list(self.players):
+            if user_id not in reactions:
+                del self.players[user_id]
+
+        for user_id, user_reactions in reactions.items():
+            # Keep the status on record when the user reacted more than once
+            known = self.reactions.get(user_id, {})
+            emoji = next((e for m, e in user_reactions.items() if known.get(m) == e),
+                         next(iter(user_reactions.values())))
+            self._set_status(users[user_id], REACTION_STATUSES[emoji])
+
+        self.reactions = reactions
+        gv.STORE.save_players(self)
+        self.schedule_update()
 
     async def update_timers(self):
         """Updates the timers after the card's time has changed."""
 
-        print("> Rise time updated by ", self.author.name)
-
-        self.notification_timer.delete()
-        self.delete_timer.delete()
+        logger.info("rise time updated", extra={"author": self.author.id})
 
         target_time_seconds = get_time_until(self.target_time)
-        self.notification_timer = gv.Timer(target_time_seconds, self.notify)
-        print(f"> Replacing Notification Timer (Execution in {target_time_seconds}s)")
+
+        self.next_reminder = 0
+        self.skip_missed_reminders()
+        reminder_seconds = get_time_until(self.get_reminder_time())
+        self.notification_timer.reschedule(reminder_seconds)
+        logger.debug("rescheduling notification timer", extra={"seconds": reminder_seconds})
 
         delete_time_seconds = target_time_seconds + int(gv.PROPERTIES["close_rise_delay"])
-        self.delete_timer = gv.Timer(delete_time_seconds, self.close)
+        self.delete_timer.reschedule(delete_time_seconds)
+
+        gv.STORE.save_card(self)
+
+    @property
+    def notified(self) -> bool:
+        """Whether every reminder of the rise was sent."""
+        return self.next_reminder >= len(self.reminder_offsets)
+
+    def get_reminder_time(self) -> Optional[datetime.datetime]:
+        """Return the time of the next reminder, or None if
+        every reminder was sent.
+        """
+
+        if self.notified:
+            return None
+
+        return self.target_time - datetime.timedelta(seconds=self.reminder_offsets[self.next_reminder])
+
+    def skip_missed_reminders(self) -> None:
+        """Skip the reminders that are already past, except the
+        latest of them, which is sent right away.
+        """
+
+        now = get_datetime_now()
+
+        while (self.next_reminder + 1 < len(self.reminder_offsets)
+               and self.target_time - datetime.timedelta(seconds=self.reminder_offsets[self.next_reminder + 1]) <= now):
+            self.next_reminder += 1
+
+    def get_notify_at(self) -> Optional[float]:
+        """Return the UTC timestamp of the next reminder, or None
+        if the participants were notified of every reminder.
+        """
+        reminder_time = self.get_reminder_time()
+        return None if reminder_time is None else reminder_time.timestamp()
+
+    def get_close_at(self) -> float:
+        """Return the UTC timestamp at which the rise closes."""
+        return self.target_time.timestamp() + int(gv.PROPERTIES["close_rise_delay"])
 
     async def notify(self):
         """Notifies the participants to the rise up."""
 
-        print("> Notifying rise by", self.author.name)
+        logger.info("notifying rise", extra={"author": self.author.id})
+
+        if self.notified:
+            return
+
+        self.next_reminder += 1
+        gv.STORE.save_card(self)
 
-        to_send = ''
+        if not self.notified:
+            self.notification_timer.reschedule(get_time_until(self.get_reminder_time()))
 
-        for key in self.players:
-            player = self.players[key]
-            to_send += f'<@{str(player.id)}> '
+        user_ids = [player.user_id for player in self.players.values()]
 
+        # A reminder caught up late, like after a restart, gives the time actually left
+        remaining = get_time_until(self.target_time)
         target_time = datetime_to_short_str(self.target_time)
-        to_send += f'\n{target_time} reminder.'
 
-        await self.message.channel.send(to_send)
+        if round(remaining / 60) > 0:
+            footer = f'\n{target_time} reminder, in {format_offset(remaining)}.'
+        else:
+            footer = f'\n{target_time} reminder.'
 
-    async def delete(self):
-        """Deletes the rise up and card."""
+        # The mentions are split across as many messages as needed, sent in order
+        for content in chunk_mentions(user_ids, footer):
+            await self.message.channel.send(content)
 
-        print("> !CRITICAL Deleting rise by", self.author.name)
+        if gv.PROPERTIES.get("reminder_dm", 0):
+            reached = await gv.DIRECT_SENDER.send_all(gv.CLIENT.http, user_ids, footer.strip())
+            logger.info("reminded players by direct message", extra={"reached": reached, "players": len(user_ids)})
 
-        del gv.CARD_MESSAGES[str(self.message.id)]
-        del gv.CARD_MESSAGES[str(self.forwarded_message.id)]
+    async def _retire(self) -> bool:
+        """(PRIVATE) Stop the card's updates and timers, and
+        unregister it if it is still active. Return whether it was.
 
-        await self.message.delete()
-        timer = gv.Timer(60, delete_message, [self.cache_message])
+        The card stops taking events, and no update may edit it once retired.
+        """
 
-        if self.forwarded_message is not None:
-            await self.forwarded_message.delete()
+        active = self.is_active()
+
+        if active:
+            del gv.CARDS[str(self.author.id)]
+
+            # The card may not have been forwarded
+            for message in self.get_messages():
+                gv.CARD_MESSAGES.pop(str(message.id), None)
+        else:
+            # Nothing displays the images a stale card uploaded
+            for cache_message in self.render_cache.clear():
+                schedule_cache_deletion(cache_message)
 
-        del gv.CARDS[str(self.author.id)]
+        await self.updates.stop()
         self.notification_timer.delete()
         self.delete_timer.delete()
+        self.reconcile_timer.delete()
+
+        return active
+
+    async def delete(self):
+        """Deletes the rise up and card."""
+
+        logger.info("deleting rise", extra={"author": self.author.id})
+
+        # A stale card, replaced by a newer rise of its author, has nothing left to delete
+        if not await self._retire():
+            return
+
+        publication = Publication()
+
+        for message in self.get_messages():
+            publication.add(message.id, "delete card", message.delete)
+
+        for failure in await publication.run():
+            logger.warning("failed to delete card", extra=failure.get_fields())
+
+        for cache_message in self.render_cache.clear():
+            schedule_cache_deletion(cache_message)
+
+        gv.STORE.delete_card(self.message.id)
         del self
 
     async def close(self):
         """Closes the rise up and deletes the card."""
-        print("> Closing rise by", self.author.name)
+        logger.info("closing rise", extra={"author": self.author.id})
 
         # Generate Closing Text
         player_list = ""
-        for key in self.players:
-            player = self.players[key]
+        for player in self.players.values():
             player_list += f" - {player.name}\n"
 
         target_time = datetime_to_short_str(self.target_time)
@@ -284,39 +727,133 @@ class Card:
         start = f"```md\n# Closed Rise Up\n{self.author.name} played {self.game.name} at [ {target_time} ]."
         end = f"\n\nParticipants:\n{player_list}```"
 
-        del gv.CARD_MESSAGES[str(self.message.id)]
-        del gv.CARD_MESSAGES[str(self.forwarded_message.id)]
+        # A stale card, replaced by a newer rise of its author, has nothing left to close
+        if not await self._retire():
+            return
 
-        await self.message.edit(content=start + end)
-        timer = gv.Timer(60, delete_message, self.cache_message)
+        publication = Publication()
+        if self.image_mode == ATTACHMENT_MODE:
+            publication.add(self.message.id, "edit closed card", lambda: self.edit_card_text(start + end))
+        else:
+            publication.add(self.message.id, "edit closed card", lambda: self.message.edit(content=start + end))
 
         if self.forwarded_message is not None:
-            await self.forwarded_message.delete()
+            publication.add(self.forwarded_message.id, "delete forwarded card", self.forwarded_message.delete)
 
-        del gv.CARDS[str(self.author.id)]
-        self.notification_timer.delete()
-        self.delete_timer.delete()
+        for failure in await publication.run():
+            logger.warning("failed to close card", extra=failure.get_fields())
+
+        for cache_message in self.render_cache.clear():
+            schedule_cache_deletion(cache_message)
+
+        gv.STORE.delete_card(self.message.id)
         del self
 
-    def get_players(self) -> List[discord.Member]:
-        """Return the list of players"""
-        return [self.players[key] for key in self.players]
+    @classmethod
+    def restore(cls, record: StoredCard, channel: discord.TextChannel) -> "Card":
+        """Return the card described by a stored record and
+        register it in the global variables. Its timers are
+        re-armed from the stored deadlines.
+        """
 
-    def get_sorted_players(self) -> List[discord.Member]:
-        """Return the sorted list of players"""
+        author = StoredUser(record.author_id, record.author_name, record.author_avatar)
+        tz = get_timezone(guild_id=record.guild_id, user_id=record.author_id)
+        target_time = datetime.datetime.fromtimestamp(record.target_time, tz=tz)
+        game = Game(name=record.game_name, img_path=record.game_img)
 
-        # Define a function to compare two players
-        def compare_players(a, b):
-            time_a = self.players_availability_type[str(a.id)].time
-            time_b = self.players_availability_type[str(b.id)].time
+        card = cls(target_time=target_time, game=game, slots=record.slots,
+                   author=author, channel=channel, ctx=None)
 
-            if time_a > time_b:
-                return 1
-            elif time_a == time_b:
-                return 0
+        if record.notify_at is None:
+            card.next_reminder = len(card.reminder_offsets)
+            card.notification_timer.delete()
+        else:
+            # Resume from the reminder the stored deadline belongs to
+            card.next_reminder = 0
+
+            while not card.notified and card.get_notify_at() < record.notify_at - 1:
+                card.next_reminder += 1
+
+            card.skip_missed_reminders()
+
+            if card.notified:
+                card.notification_timer.delete()
             else:
-                return -1
+                card.notification_timer.reschedule(get_time_until(card.get_reminder_time()))
+
+        card.message = PartialMessage(channel, record.card_id)
+
+        if record.forwarded_message_id is not None:
+            forwarded_channel = gv.CLIENT.get_channel(record.forwarded_channel_id)
+
+            if forwarded_channel is not None:
+                card.forwarded_message = PartialMessage(forwarded_channel, record.forwarded_message_id)
+
+        # Players are loaded in the order they joined
+        card.players = {str(player.user_id): player for player in record.players}
+
+        card.reactions = {str(user_id): reactions for user_id, reactions in record.reactions.items()}
+
+        # The images uploaded before the restart are reused, or deleted once evicted or closed
+        for image in record.cache_images:
+            card.render_cache.put(image.digest, image)
+
+        author_id = str(author.id)
+        gv.CARDS[author_id] = card
+
+        for message in card.get_messages():
+            gv.CARD_MESSAGES[str(message.id)] = author_id
+
+        # Reactions may have changed while the bot was offline
+        card.reconcile_timer.reschedule(0)
+
+        return card
+
+    def get_players(self) -> List[Participant]:
+        """Return the list of players in the order they joined"""
+        return list(self.players.values())
+
+
+def restore_cards(guild_id: Optional[int] = None) -> int:
+    """Restore the active rises of the guilds handled by this
+    process from gv.STORE, or of a single guild, and return the
+    number of rises restored.
+
+    Rises of unavailable guilds are left in the store until the
+    guild is available. Rises whose channel was deleted are dropped.
+    """
+
+    restored = 0
+
+    for record in gv.STORE.load():
+        # Rises of other shards belong to other processes
+        if not gv.SHARD_CONFIG.owns_guild(record.guild_id):
+            continue
+
+        if guild_id is not None and record.guild_id != guild_id:
+            continue
+
+        # The rise was restored when the bot first connected
+        if str(record.card_id) in gv.CARD_MESSAGES:
+            continue
+
+        channel = gv.CLIENT.get_channel(record.channel_id)
+
+        if channel is None:
+            guild = gv.CLIENT.get_guild(record.guild_id)
+
+            # The channels of a guild are unknown while it is unavailable
+            if guild is None or guild.unavailable:
+                logger.info("skipped rise of an unavailable guild", extra={"guild": record.guild_id})
+                continue
+
+            for image in record.cache_images:
+                schedule_cache_deletion(image)
+
+            gv.STORE.delete_card(record.card_id)
+            continue
 
-        players = self.get_players()
+        Card.restore(record, channel)
+        restored += 1
 
-        return sorted(players, key=cmp_to_key(compare_players))
\ No newline at end of file
+    return restored
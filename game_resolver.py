@@ -0,0 +1,227 @@
+"""Module containing the GameResolver class. Builds an index
+over the names and aliases of the stored games once, and
+resolves partial, shorthand and misspelled game names with it.
+
+A query is resolved by, in order:
+    - an exact match of its normalized form
+    - the completion of it as a prefix of a name or alias, found
+      in a trie, if every completion belongs to the same game
+    - the closest name sharing the most trigrams with it, within
+      a few typos of it
+
+Anything else is an unknown game. For instance, "valorent" is
+Valorant, but "Fortnite" is not The Forest (alias "for") and
+"Rocket League" is not League.
+"""
+
+from typing import Dict, List, Optional, Tuple
+from collections import Counter
+import re
+
+
+NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+
+# Queries shorter than this are only matched exactly
+MIN_PARTIAL_LENGTH = 2
+# Queries and keys shorter than this are never matched as misspellings
+MIN_FUZZY_LENGTH = 4
+MIN_SIMILARITY = 0.4
+# A misspelling may differ from the key by one edit per this many characters
+CHARACTERS_PER_EDIT = 4
+
+
+def normalize(name: str) -> str:
+    """Return name lowercased with everything but letters
+    and digits removed, so that "CS:GO" and "bed wars"
+    match "csgo" and "bedwars".
+    """
+    return NON_ALPHANUMERIC.sub("", name.lower())
+
+
+def get_max_edits(key: str) -> int:
+    """Return the number of typos allowed in a misspelling of key."""
+    return max(1, len(key) // CHARACTERS_PER_EDIT)
+
+
+def get_edit_distance(a: str, b: str, limit: int) -> int:
+    """Return the Levenshtein distance between a and b, or
+    limit + 1 if it is greater than limit.
+    """
+
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous = list(range(len(b) + 1))
+
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+
+        if min(current) > limit:
+            return limit + 1
+
+        previous = current
+
+    return min(previous[-1], limit + 1)
+
+
+def get_trigrams(key: str) -> List[str]:
+    """Return the trigrams of a normalized key, padded so
+    that short keys still produce some.
+    """
+    padded = f"  {key} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+class _TrieNode:
+    """(PRIVATE) A node of the prefix trie."""
+    __slots__ = ("children", "best", "game")
+
+    def __init__(self):
+        self.children = {}
+        self.best = None
+        # The game of every key below the node, or None if they differ
+        self.game = -1
+
+
+class GameResolver:
+    """An index over game names and aliases."""
+
+    def __init__(self, games: Dict[str, dict]):
+        """Build the index from the games dictionary, which maps
+        aliases to the game's name and image.
+        """
+
+        self._games: List[Tuple[str, str]] = []
+        self._exact: Dict[str, int] = {}
+        self._trie = _TrieNode()
+        self._trigrams: Dict[str, List[str]] = {}
+        self._gram_counts: Dict[str, int] = {}
+
+        game_ids = {}
+
+        for alias, game in games.items():
+            entry = (game["name"], game["img"])
+
+            if entry not in game_ids:
+                game_ids[entry] = len(self._games)
+                self._games.append(entry)
+
+            # Both the alias and the full name resolve to the game
+            for key in (normalize(alias), normalize(game["name"])):
+                if key and key not in self._exact:
+                    self._exact[key] = game_ids[entry]
+
+        for key in self._exact:
+            self._add_to_trie(key)
+
+            # Short aliases like "for" or "cs" would be near any query
+            if len(key) < MIN_FUZZY_LENGTH:
+                continue
+
+            grams = set(get_trigrams(key))
+            self._gram_counts[key] = len(grams)
+
+            for gram in grams:
+                self._trigrams.setdefault(gram, []).append(key)
+
+    def __len__(self) -> int:
+        """Return the number of indexed keys."""
+        return len(self._exact)
+
+    def resolve(self, query: str) -> Optional[Tuple[str, str]]:
+        """Return the name and image path of the game best
+        matching query, or None if nothing matches.
+        """
+
+        key = normalize(query)
+
+        if not key:
+            return None
+
+        if key in self._exact:
+            return self._games[self._exact[key]]
+
+        if len(key) < MIN_PARTIAL_LENGTH:
+            return None
+
+        completion = self._complete(key)
+
+        if completion is not None:
+            return self._games[self._exact[completion]]
+
+        similar = self._find_similar(key)
+
+        if similar is not None:
+            return self._games[self._exact[similar]]
+
+        return None
+
+    def _add_to_trie(self, key: str) -> None:
+        """(PRIVATE) Insert key into the trie. Every node keeps
+        its shortest completion, so lookups never walk subtrees.
+        """
+
+        node = self._trie
+        game_id = self._exact[key]
+
+        for char in key:
+            node = node.children.setdefault(char, _TrieNode())
+
+            if node.game == -1:
+                node.game = game_id
+            elif node.game != game_id:
+                node.game = None
+
+            if node.best is None or (len(key), key) < (len(node.best), node.best):
+                node.best = key
+
+    def _complete(self, prefix: str) -> Optional[str]:
+        """(PRIVATE) Return the shortest key starting with prefix,
+        if every key starting with it is of the same game.
+        """
+
+        node = self._trie
+
+        for char in prefix:
+            node = node.children.get(char)
+
+            if node is None:
+                return None
+
+        return node.best if node.game is not None else None
+
+    def _find_similar(self, key: str) -> Optional[str]:
+        """(PRIVATE) Return the key with the highest trigram
+        similarity to key, if it is similar enough and within a
+        few edits of key.
+        """
+
+        if len(key) < MIN_FUZZY_LENGTH:
+            return None
+
+        grams = set(get_trigrams(key))
+        shared = Counter()
+
+        for gram in grams:
+            shared.update(self._trigrams.get(gram, ()))
+
+        best = None
+        best_score = MIN_SIMILARITY
+
+        for candidate, count in shared.items():
+            score = 2 * count / (len(grams) + self._gram_counts[candidate])
+
+            if not (score > best_score or (score == best_score and best is not None and candidate < best)):
+                continue
+
+            # Sharing trigrams is not enough, "rocketleague" shares half of them with "league"
+            limit = get_max_edits(candidate)
+
+            if get_edit_distance(key, candidate, limit) <= limit:
+                best = candidate
+                best_score = score
+
+        return best
@@ -1,32 +1,48 @@
 """Module for handling global variables for the
 rise up bot.
 
+Importing this module is cheap and has no side effects. Everything
+that needs configuration or is costly to build lives on APP, and is
+created on first access through the module attribute naming it.
+
 Global Variables:
-    - GAMES: a dictionary containing stored game information
-    - PROPERTIES: the bot properties
-    - GUILD_DATA: the stored data for the bot's guilds
-    - TIMEZONE: the pytz.timezone object for the main timezone of the bot
+    - APP: the application object creating the lazy globals below
+    - GAMES: a dictionary containing stored game information (lazy)
+    - GAME_RESOLVER: the index resolving partial game names (lazy)
+    - PROPERTIES: the bot properties (lazy)
+    - CLIENT: the discord.py bot client, sharded if configured (lazy)
+    - SHARD_CONFIG: the shards run by this process (lazy)
+    - GUILD_CONFIG: the stored settings of the bot's guilds (lazy)
+    - USER_CONFIG: the stored settings of the bot's users (lazy)
+    - TIMEZONE: the default timezone of the bot, used where no guild or user timezone is set (lazy)
     - CARD_MESSAGES: a dictionary mapping message_ids to the card represented by the message
     - CARDS: a dictionary mapping an author id to their active rise
+    - PENDING_MESSAGES: the messages the bot expects to see posted (lazy)
+    - DIRECT_SENDER: the sender delivering reminders by direct message (lazy)
+    - METRICS_EXPORTER: the exporter serving and writing the bot's metrics (lazy)
+    - STORE: the durable store of the active rises (lazy)
     - CACHE_CHANNEL: the channel the bot uses for caching images
+    - CACHE_COLLECTOR: the collector deleting released cache messages in bulk (lazy)
     - READY: whether or not the bot has loaded into discord servers
-    - IMGKIT_CONFIG: the imgkit config storing the wkhtmltopdf path
+    - IMGKIT_CONFIG: the imgkit config storing the wkhtmltopdf path (lazy)
+    - TIMERS: the scheduler holding every pending Timer (lazy)
+    - RENDERER: the render backend used to draw cards (lazy)
+    - AVATARS: the cache of downscaled avatar images (lazy)
+    - RENDER_POOL: the worker pool rendering cards off the event loop (lazy)
 """
 
 from __future__ import annotations
-from typing import Optional, Dict
-import datetime
+from typing import TYPE_CHECKING, Optional, Dict
+from functools import cached_property
 import json
+import logging
 import os
-import discord
-import imgkit
-import asyncio
-import pytz
-from card import Card
+
+if TYPE_CHECKING:
+    from card import Card
 
 
-from discord.ext import commands
-CLIENT = commands.Bot(command_prefix='/', intents=discord.Intents.all())
+logger = logging.getLogger(__name__)
 
 
 class DummyMessage:
@@ -58,49 +74,242 @@ class DummyAvatar:
         self.avatar_url = avatar_url
 
 
+class App:
+    """The application object of the bot. Builds the configured
+    parts of the bot on first access, so that importing a module
+    never requires a valid properties.json or a discord client.
+
+    Instance Attributes:
+        - root_dir: the directory of the bot's data files
+    """
+    root_dir: str
+
+    def __init__(self, root_dir: str):
+        """Initialize the application. Nothing is loaded yet."""
+        self.root_dir = root_dir
+
+    def get_path(self, name: str) -> str:
+        """Return the path of a data file of the bot."""
+        return os.path.join(self.root_dir, name)
+
+    async def close(self) -> None:
+        """Close the HTTP session, worker threads and metrics
+        endpoint of the bot. Parts never built are left alone.
+        """
+
+        if "metrics_exporter" in self.__dict__:
+            await self.metrics_exporter.stop()
+
+        if "avatars" in self.__dict__:
+            await self.avatars.close()
+
+        if "render_pool" in self.__dict__:
+            self.render_pool.shutdown()
+
+    @cached_property
+    def timers(self):
+        from timer_scheduler import TimerScheduler
+        return TimerScheduler()
+
+    @cached_property
+    def pending_messages(self):
+        from pending_messages import PendingMessages
+        return PendingMessages()
+
+    @cached_property
+    def direct_sender(self):
+        from reminders import DirectSender
+        return DirectSender(int(self.properties.get("reminder_dm_concurrency", 4)))
+
+    @cached_property
+    def properties(self) -> dict:
+        return load_json("properties.json")
+
+    @cached_property
+    def games(self) -> dict:
+        return load_json("games.json")
+
+    @cached_property
+    def game_resolver(self):
+        from game_resolver import GameResolver
+        return GameResolver(self.games)
+
+    @cached_property
+    def timezone(self):
+        from timezones import get_zone
+        return get_zone(self.properties["timezone"])
+
+    @cached_property
+    def shard_config(self):
+        from sharding import get_shard_config
+        return get_shard_config(self.properties)
+
+    @cached_property
+    def client(self):
+        from discord.ext import commands
+
+        options = self.get_client_options(self.properties.get("intents_profile", "minimal"))
+
+        if self.shard_config.sharded:
+            base = commands.AutoShardedBot
+            options.update(shard_ids=self.shard_config.shard_ids, shard_count=self.shard_config.shard_count)
+        else:
+            base = commands.Bot
+
+        app = self
+
+        class Client(base):
+            async def close(self):
+                """Close the connection to discord, then the parts of the bot."""
+                await super().close()
+                await app.close()
+
+        return Client(command_prefix='/', **options)
+
+    @staticmethod
+    def get_client_options(profile: str) -> dict:
+        """Return the gateway intents and member cache options
+        of an intents profile:
+            - minimal: only the events the bot handles, guilds, guild
+              messages and guild reactions, without a member cache
+            - all: every event, with every member of every guild cached
+        """
+        import discord
+
+        if profile == "all":
+            return {"intents": discord.Intents.all()}
+
+        if profile != "minimal":
+            raise ValueError(f"Unknown intents profile {profile}")
+
+        # Members are taken from the events and interactions that carry them instead
+        return {"intents": discord.Intents(guilds=True, guild_messages=True, guild_reactions=True),
+                "member_cache_flags": discord.MemberCacheFlags.none(),
+                "chunk_guilds_at_startup": False}
+
+    @cached_property
+    def guild_config(self):
+        from guild_config import GuildConfig
+        return GuildConfig(self.get_path("guild_data.json"), shared=self.shard_config.shard_ids is not None)
+
+    @cached_property
+    def user_config(self):
+        from guild_config import GuildConfig
+        return GuildConfig(self.get_path("user_data.json"), shared=self.shard_config.shard_ids is not None)
+
+    @cached_property
+    def imgkit_config(self):
+        import imgkit
+
+        if self.properties["wkhtmltoimage_is_relative"]:
+            path = self.root_dir + self.properties["wkhtmltoimage"]
+        else:
+            path = self.properties["wkhtmltoimage"]
+
+        return imgkit.config(wkhtmltoimage=path)
+
+    @cached_property
+    def renderer(self):
+        from renderer import create_renderer
+        return create_renderer(self.properties.get("renderer", "pillow"),
+                               self.properties.get("render_format", "jpeg"))
+
+    @cached_property
+    def avatars(self):
+        from avatar_cache import AvatarCache, CDN_URL
+        return AvatarCache(self.get_path(self.properties.get("avatar_cache_dir", "avatar_cache")),
+                           max_memory=int(self.properties.get("avatar_cache_size", 256)),
+                           base_url=self.properties.get("avatar_cdn_url", CDN_URL))
+
+    @cached_property
+    def render_pool(self):
+        from render_pool import RenderPool
+        return RenderPool(self.renderer.render,
+                          workers=int(self.properties.get("render_workers", 2)),
+                          max_queue=int(self.properties.get("render_queue_size", 32)))
+
+    @cached_property
+    def cache_collector(self):
+        from cache_collector import CacheCollector
+        if self.shard_config.shard_ids is None:
+            path = self.get_path("cache_pending.json")
+        else:
+            # Every worker of the launcher collects its own messages
+            path = self.get_path(f"cache_pending.{self.shard_config.label}.json")
+
+        return CacheCollector(path,
+                              delay=float(self.properties.get("cache_delete_delay", 60)),
+                              interval=float(self.properties.get("cache_collect_interval", 60)))
+
+    @cached_property
+    def metrics_exporter(self):
+        from metrics import MetricsExporter, REGISTRY
+
+        port = int(self.properties.get("metrics_port", 0)) or None
+        path = self.properties.get("metrics_path") or None
+
+        if self.shard_config.shard_ids is not None:
+            # Every worker of the launcher exports its own metrics
+            if port is not None:
+                port += self.shard_config.shard_ids[0]
+
+            if path is not None:
+                root, ext = os.path.splitext(path)
+                path = f"{root}.{self.shard_config.label}{ext}"
+
+        return MetricsExporter(REGISTRY, port=port, host=self.properties.get("metrics_host", "127.0.0.1"),
+                               path=path and self.get_path(path),
+                               interval=float(self.properties.get("metrics_interval", 60)))
+
+    @cached_property
+    def store(self):
+        from rise_store import RiseStore
+        return RiseStore(self.get_path(self.properties.get("store_path", "rises.db")))
+
+
 class Timer:
     """A class with methods for handling asynchronous functions
     executed after a set amount of time.
+
+    Timers do not own a task. They are kept in TIMERS, which
+    starts them once their deadline has passed.
     """
 
-    def __init__(self, timeout: int, callback, args: Optional[list] = None, kw_args: Optional[dict] = None):
-        """Initialize the timer"""
+    def __init__(self, timeout: float, callback, args: Optional[list] = None, kw_args: Optional[dict] = None):
+        """Initialize and schedule the timer"""
 
         if kw_args is None:
             kw_args = {}
-        self._timeout = timeout
         self._callback = callback
-        self._task = asyncio.ensure_future(self._job())
         self.deleted = False
 
         self.args = args
         self.kw_args = kw_args
 
+        APP.timers.schedule(self, timeout)
+
+    def __repr__(self) -> str:
+        return f"Timer({getattr(self._callback, '__qualname__', self._callback)})"
+
     def delete(self):
         """Delete the timer and prevent execution"""
         self.deleted = True
+        APP.timers.cancel(self)
 
-    async def _job(self):
-        """(PRIVATE) Execute the timed function"""
-        await asyncio.sleep(self._timeout)
+    def reschedule(self, timeout: float):
+        """Execute the timer in timeout seconds instead"""
+        self.deleted = False
+        APP.timers.schedule(self, timeout)
 
-        if self.deleted:
-            print("|| Timer called but was deleted!")
-            del self
-            return
+    async def run(self):
+        """Execute the timed function"""
 
-        print("|| Timer called and is being executed...")
+        logger.debug("running timer", extra={"timer": repr(self)})
 
         if self.args is None:
-            if self.kw_args is None:
-                await self._callback()
-            else:
-                await self._callback(**self.kw_args)
+            await self._callback(**self.kw_args)
         else:
-            if self.kw_args is None:
-                await self._callback(*self.args)
-            else:
-                await self._callback(*self.args, **self.kw_args)
+            await self._callback(*self.args, **self.kw_args)
 
 
 def load_json(path):
@@ -124,12 +333,8 @@ async def refresh_message(message):
 # DEFINE GLOBAL VARIABLES
 # =====================================================
 
-GAMES = load_json("games.json")
-PROPERTIES = load_json("properties.json")
-GUILD_DATA = load_json("guild_data.json")
-
-pytz.utc.localize(datetime.datetime.utcnow()).astimezone(pytz.timezone('US/Pacific'))
-TIMEZONE = pytz.timezone(PROPERTIES["timezone"])
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+APP = App(ROOT_DIR)
 
 # Dict mapping message ids to the author of the relevant rise.
 CARD_MESSAGES = {}
@@ -141,12 +346,40 @@ CARDS: Dict[str, Card]
 
 CACHE_CHANNEL = None
 
-ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 READY = False
 
-if PROPERTIES["wkhtmltoimage_is_relative"]:
-    _path = ROOT_DIR + PROPERTIES["wkhtmltoimage"]
-else:
-    _path = PROPERTIES["wkhtmltoimage"]
+# Module attributes created by APP on first access
+_LAZY_GLOBALS = {
+    "PROPERTIES": "properties",
+    "GAMES": "games",
+    "GAME_RESOLVER": "game_resolver",
+    "TIMEZONE": "timezone",
+    "CLIENT": "client",
+    "SHARD_CONFIG": "shard_config",
+    "GUILD_CONFIG": "guild_config",
+    "USER_CONFIG": "user_config",
+    "IMGKIT_CONFIG": "imgkit_config",
+    "RENDERER": "renderer",
+    "AVATARS": "avatars",
+    "RENDER_POOL": "render_pool",
+    "CACHE_COLLECTOR": "cache_collector",
+    "STORE": "store",
+    "TIMERS": "timers",
+    "PENDING_MESSAGES": "pending_messages",
+    "DIRECT_SENDER": "direct_sender",
+    "METRICS_EXPORTER": "metrics_exporter"
+}
+
+
+def __getattr__(name: str):
+    """Create a lazy global on first access. It is then stored
+    on the module, so later accesses are plain lookups.
+    """
+
+    if name not in _LAZY_GLOBALS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(APP, _LAZY_GLOBALS[name])
+    globals()[name] = value
 
-IMGKIT_CONFIG = imgkit.config(wkhtmltoimage=_path)
\ No newline at end of file
+    return value
@@ -0,0 +1,208 @@
+"""Module containing the GuildConfig class. Stores the
+per-guild settings of the bot in a JSON snapshot plus an
+append-only journal of per-guild updates.
+
+Updates only append a line to the journal. The journal is
+folded into a new snapshot, which replaces the old one
+atomically, once it grows past a set number of entries. A line
+torn by a crash is dropped on the next load, or skipped when the
+journal is shared, and never merged with the lines after it.
+
+A config shared by several bot processes picks up the entries
+the others append to the journal. Shared configs are never
+compacted by the processes using them, only before they start.
+"""
+
+from typing import Dict, Optional
+import json
+import os
+import threading
+
+
+class GuildConfig:
+    """A lazily loaded index of per-guild settings.
+
+    Instance Attributes:
+        - path: the path of the JSON snapshot
+        - journal_path: the path of the update journal
+        - compact_after: the number of journal entries that
+          triggers a new snapshot
+        - shared: whether other processes update the config too
+    """
+    path: str
+    journal_path: str
+    compact_after: int
+    shared: bool
+
+    def __init__(self, path: str, compact_after: int = 256, shared: bool = False):
+        """Initialize the config. Nothing is read until the
+        first lookup.
+        """
+
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.compact_after = compact_after
+        self.shared = shared
+
+        self._index: Optional[Dict[str, dict]] = None
+        self._journal_entries = 0
+        self._journal_offset = 0
+        self._lock = threading.Lock()
+
+    def __contains__(self, guild_id) -> bool:
+        """Return whether the guild has been setup."""
+        return str(guild_id) in self._get_index()
+
+    def __len__(self) -> int:
+        """Return the number of configured guilds."""
+        return len(self._get_index())
+
+    def get(self, guild_id) -> Optional[dict]:
+        """Return the settings of a guild, or None if it has
+        not been setup. Never reads the disk once loaded, unless
+        the journal of a shared config has grown.
+        """
+        return self._get_index().get(str(guild_id))
+
+    def update(self, guild_id, **fields) -> dict:
+        """Update the settings of a guild and durably record
+        the change. Return the new settings of the guild.
+        """
+
+        guild_id = str(guild_id)
+
+        with self._lock:
+            index = self._get_index()
+            line = (json.dumps({"guild": guild_id, "fields": fields}) + "\n").encode()
+            line = self._append(line)
+
+            if self.shared:
+                # Entries appended by other processes are replayed in order with this one
+                self._replay_journal()
+                return index[guild_id]
+
+            index[guild_id] = dict(index.get(guild_id, {}), **fields)
+            self._journal_entries += 1
+            self._journal_offset += len(line)
+
+            if self._journal_entries >= self.compact_after:
+                self._compact()
+
+        return index[guild_id]
+
+    def compact(self) -> None:
+        """Fold the journal into a new snapshot."""
+
+        with self._lock:
+            self._get_index()
+            self._compact()
+
+    def _get_index(self) -> Dict[str, dict]:
+        """(PRIVATE) Return the index, loading the snapshot and
+        replaying the journal on first use.
+        """
+
+        if self._index is not None:
+            if self.shared:
+                self._replay_journal()
+
+            return self._index
+
+        self._index = {}
+        self._journal_entries = 0
+        self._journal_offset = 0
+
+        if os.path.isfile(self.path):
+            with open(self.path, "r") as f:
+                self._index = json.load(f)
+
+        self._replay_journal()
+
+        if not self.shared:
+            self._truncate_journal()
+
+        return self._index
+
+    def _append(self, line: bytes) -> bytes:
+        """(PRIVATE) Durably append a line to the journal and
+        return the bytes written. The line starts on a new line
+        even if the journal ends with a torn one.
+        """
+
+        with open(self.journal_path, "ab+") as f:
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+
+                if f.read(1) != b"\n":
+                    line = b"\n" + line
+
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+        return line
+
+    def _truncate_journal(self) -> None:
+        """(PRIVATE) Drop a torn line left at the end of the
+        journal by a crash. Only for configs with a single writer.
+        """
+
+        try:
+            size = os.path.getsize(self.journal_path)
+        except OSError:
+            return
+
+        if size > self._journal_offset:
+            with open(self.journal_path, "rb+") as f:
+                f.truncate(self._journal_offset)
+
+    def _replay_journal(self) -> None:
+        """(PRIVATE) Apply the journal entries past the ones
+        already applied to the index.
+        """
+
+        try:
+            size = os.path.getsize(self.journal_path)
+        except OSError:
+            size = 0
+
+        if size == self._journal_offset:
+            return
+
+        with open(self.journal_path, "rb") as f:
+            f.seek(self._journal_offset)
+
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # A write still in progress, or torn at the end of the journal
+                    break
+
+                self._journal_offset += len(line)
+
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A line torn by a crash, the entries after it are intact
+                    continue
+
+                self._index[entry["guild"]] = dict(self._index.get(entry["guild"], {}), **entry["fields"])
+                self._journal_entries += 1
+
+    def _compact(self) -> None:
+        """(PRIVATE) Atomically write a snapshot of the index
+        and empty the journal.
+        """
+
+        temp_path = self.path + ".tmp"
+
+        with open(temp_path, "w") as f:
+            json.dump(self._index, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(temp_path, self.path)
+
+        # The snapshot holds every entry, so a crash here only replays them again
+        open(self.journal_path, "w").close()
+        self._journal_entries = 0
+        self._journal_offset = 0
@@ -0,0 +1,199 @@
+"""Module for running the bot as a cluster of processes, each
+connecting a contiguous range of the shards and handling the
+rises of their guilds.
+
+The launcher starts one bot.py worker per shard range and
+restarts workers that exit, waiting longer after each crash
+of a worker that keeps failing. Stopping the launcher stops
+every worker.
+
+Usage:
+    python launcher.py [--shards N] [--processes P] [--dry-run]
+"""
+
+from typing import List, Optional
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+from global_vars import ROOT_DIR, load_json
+from guild_config import GuildConfig
+from sharding import SHARD_COUNT_VARIABLE, SHARD_IDS_VARIABLE
+
+
+RESTART_DELAY = 5
+MAX_RESTART_DELAY = 300
+# A worker running this long is considered healthy again
+STABLE_AFTER = 600
+STOP_TIMEOUT = 30
+
+
+def get_shard_ranges(shard_count: int, processes: int) -> List[range]:
+    """Return shard_count shards split into at most processes
+    contiguous ranges of nearly equal size.
+    """
+
+    processes = max(1, min(processes, shard_count))
+    size, extra = divmod(shard_count, processes)
+
+    ranges = []
+    start = 0
+
+    for i in range(processes):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(range(start, end))
+        start = end
+
+    return ranges
+
+
+class Worker:
+    """A bot process running a range of shards.
+
+    Instance Attributes:
+        - shard_ids: the shards run by the worker
+        - shard_count: the total number of shards
+        - process: the running process, or None if it is not running
+        - failures: the number of crashes in a row
+        - restart_at: the time the worker is restarted at
+    """
+    shard_ids: range
+    shard_count: int
+    process: Optional[subprocess.Popen]
+    failures: int
+    restart_at: float
+
+    def __init__(self, shard_ids: range, shard_count: int):
+        """Initialize the worker. It is not started yet."""
+
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.process = None
+        self.failures = 0
+        self.restart_at = 0
+
+        self._started_at = 0
+
+    def __repr__(self) -> str:
+        return f"Worker(shards {self.shard_ids.start}-{self.shard_ids.stop - 1})"
+
+    def start(self) -> None:
+        """Start the bot process of the worker."""
+
+        env = dict(os.environ)
+        env[SHARD_IDS_VARIABLE] = f"{self.shard_ids.start}-{self.shard_ids.stop - 1}"
+        env[SHARD_COUNT_VARIABLE] = str(self.shard_count)
+
+        print(f"> Starting {self!r}...")
+
+        self.process = subprocess.Popen([sys.executable, os.path.join(ROOT_DIR, "bot.py")], env=env)
+        self._started_at = time.monotonic()
+
+    def poll(self) -> None:
+        """Restart the worker if its process has exited."""
+
+        now = time.monotonic()
+
+        if self.process is None:
+            if now >= self.restart_at:
+                self.start()
+
+            return
+
+        code = self.process.poll()
+
+        if code is None:
+            return
+
+        if now - self._started_at >= STABLE_AFTER:
+            self.failures = 0
+
+        delay = min(RESTART_DELAY * 2 ** self.failures, MAX_RESTART_DELAY)
+        self.failures += 1
+        self.process = None
+        self.restart_at = now + delay
+
+        print(f"|| {self!r} exited with code {code}, restarting in {delay}s...")
+
+    def stop(self) -> None:
+        """Ask the process of the worker to stop."""
+
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+
+    def wait(self, timeout: float) -> None:
+        """Wait for the process of the worker to stop, killing
+        it if it takes longer than timeout seconds.
+        """
+
+        if self.process is None:
+            return
+
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    """Run the launcher until it is stopped and return its
+    exit code.
+    """
+
+    properties = load_json("properties.json")
+
+    parser = argparse.ArgumentParser(description="Run the bot as a cluster of sharded processes.")
+    parser.add_argument("--shards", type=int, default=properties.get("shard_count") or None,
+                        help="the total number of shards")
+    parser.add_argument("--processes", type=int, default=properties.get("shard_processes") or os.cpu_count(),
+                        help="the number of worker processes, by default one per core")
+    parser.add_argument("--dry-run", action="store_true", help="only show the shards of each worker")
+    options = parser.parse_args(args)
+
+    if not options.shards:
+        parser.error("set shard_count in properties.json or pass --shards")
+
+    workers = [Worker(shard_ids, options.shards)
+               for shard_ids in get_shard_ranges(options.shards, options.processes)]
+
+    if options.dry_run:
+        for worker in workers:
+            print(worker)
+
+        return 0
+
+    # The workers share these configs, and only append to them while running
+    for name in ("guild_data.json", "user_data.json"):
+        GuildConfig(os.path.join(ROOT_DIR, name)).compact()
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    while not stopping:
+        for worker in workers:
+            worker.poll()
+
+        time.sleep(1)
+
+    print("> Stopping workers...")
+
+    for worker in workers:
+        worker.stop()
+
+    for worker in workers:
+        worker.wait(STOP_TIMEOUT)
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
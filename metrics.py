@@ -0,0 +1,463 @@
+"""Module containing the bot's metrics and its log format.
+
+Metrics are counters, gauges and latency histograms kept in
+memory. Recording one is a dictionary lookup and a few additions,
+so they are safe to use on every event. The metrics are exported
+in the Prometheus text format, served over HTTP or written to a
+file at a fixed interval by the MetricsExporter.
+
+Logs are written one record per line as key=value pairs (logfmt).
+Fields given through the extra argument of a logging call are
+appended to the line.
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from bisect import bisect_left
+from functools import wraps
+import asyncio
+import logging
+import os
+import time
+import global_vars as gv
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds, from a cached edit to a slow upload
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CALL_COUNT_BUCKETS = (1, 2, 3, 4, 6, 8, 12, 16)
+
+
+def _format_value(value: float) -> str:
+    """(PRIVATE) Return a sample value in the Prometheus text format."""
+
+    if value == float("inf"):
+        return "+Inf"
+
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """(PRIVATE) Return the label set of a sample, like {call="edit card"}."""
+
+    if not names:
+        return ""
+
+    pairs = (name + '="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+             for name, value in zip(names, values))
+
+    return "{" + ",".join(pairs) + "}"
+
+
+class _CounterChild:
+    """(PRIVATE) The value of a counter for one label set."""
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeChild:
+    """(PRIVATE) The value of a gauge for one label set."""
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+
+class _HistogramChild:
+    """(PRIVATE) The observations of a histogram for one label set."""
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # One count per bucket, and one for the observations above every bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> "Timing":
+        return Timing(self)
+
+
+class Timing:
+    """A context manager and decorator observing the seconds spent
+    in a block or a function, coroutine functions included.
+    """
+
+    def __init__(self, histogram):
+        """Initialize the timing of a histogram without labels
+        or of one of its label sets.
+        """
+        self._histogram = histogram
+        self._start = None
+
+    def __enter__(self) -> "Timing":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._histogram.observe(time.perf_counter() - self._start)
+
+    def __call__(self, function: Callable) -> Callable:
+        histogram = self._histogram
+
+        if asyncio.iscoroutinefunction(function):
+            @wraps(function)
+            async def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await function(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - start)
+        else:
+            @wraps(function)
+            def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - start)
+
+        return timed
+
+
+class _Metric:
+    """(PRIVATE) A named metric holding one value per label set.
+
+    Instance Attributes:
+        - name: the name of the metric
+        - documentation: the description of the metric
+        - labelnames: the names of the labels of the metric
+    """
+    kind = ""
+
+    name: str
+    documentation: str
+    labelnames: Tuple[str, ...]
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        """Initialize the metric"""
+
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+        self._children: Dict[tuple, object] = {}
+
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def labels(self, *values) -> object:
+        """Return the value of the metric for a label set."""
+
+        child = self._children.get(values)
+
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes the labels {self.labelnames}")
+
+            child = self._children[values] = self._new_child()
+
+        return child
+
+    def collect(self) -> List[str]:
+        """Return the lines of the metric in the Prometheus text format."""
+
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+        for values, child in self._children.items():
+            lines.extend(self._collect_child(values, child))
+
+        return lines
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _collect_child(self, values: tuple, child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+
+class Counter(_Metric):
+    """A count that only goes up, like the number of REST calls."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Add amount to the counter. It must have no labels."""
+        self._children[()].inc(amount)
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class Gauge(_Metric):
+    """A value that goes up and down. A gauge given a function
+    reads its value from it when collected instead, like the
+    number of active cards.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 function: Optional[Callable[[], float]] = None):
+        """Initialize the gauge"""
+        super().__init__(name, documentation, labelnames)
+        self._function = function
+
+    def set(self, value: float) -> None:
+        """Set the gauge. It must have no labels."""
+        self._children[()].set(value)
+
+    def collect(self) -> List[str]:
+        if self._function is not None:
+            self._children[()].set(self._function())
+
+        return super().collect()
+
+    def _new_child(self):
+        return _GaugeChild()
+
+
+class Histogram(_Metric):
+    """A distribution of observations, like the latency of renders,
+    counted into cumulative buckets.
+    """
+    kind = "histogram"
+
+    buckets: Tuple[float, ...]
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        """Initialize the histogram"""
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value: float) -> None:
+        """Record an observation. The histogram must have no labels."""
+        self._children[()].observe(value)
+
+    def time(self) -> Timing:
+        """Return a Timing observing the seconds it measures.
+        The histogram must have no labels.
+        """
+        return Timing(self._children[()])
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _collect_child(self, values: tuple, child: _HistogramChild) -> List[str]:
+        names = self.labelnames + ("le",)
+        lines = []
+        cumulative = 0
+
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{_format_labels(names, values + (_format_value(bound),))} {cumulative}")
+
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+
+        return lines
+
+
+class Registry:
+    """A collection of metrics exported together."""
+
+    def __init__(self):
+        """Initialize an empty registry"""
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric to the registry and return it."""
+
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text format."""
+
+        lines = []
+
+        for metric in self._metrics.values():
+            lines.extend(metric.collect())
+
+        return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """Exports a registry over HTTP, on /metrics, and to a file
+    rewritten every interval seconds. Either output is off when
+    its port or path is not set.
+
+    Instance Attributes:
+        - registry: the exported metrics
+        - port: the port of the HTTP endpoint, or None
+        - host: the host the HTTP endpoint listens on
+        - path: the file the metrics are written to, or None
+        - interval: seconds between two writes of the file
+    """
+    registry: Registry
+    port: Optional[int]
+    host: str
+    path: Optional[str]
+    interval: float
+
+    def __init__(self, registry: Registry, port: Optional[int] = None, host: str = "127.0.0.1",
+                 path: Optional[str] = None, interval: float = 60):
+        """Initialize the exporter. Nothing is exported yet."""
+
+        self.registry = registry
+        self.port = port
+        self.host = host
+        self.path = path
+        self.interval = interval
+
+        self._runner = None
+        self._timer = None
+
+    async def start(self) -> None:
+        """Start the endpoint and the file writes. Starting a
+        running exporter does nothing.
+        """
+
+        if self.port and self._runner is None:
+            from aiohttp import web
+
+            app = web.Application()
+            app.router.add_get("/metrics", self._handle)
+
+            self._runner = web.AppRunner(app)
+            await self._runner.setup()
+            await web.TCPSite(self._runner, self.host, self.port).start()
+
+            logger.info("serving metrics", extra={"host": self.host, "port": self.port})
+
+        if self.path and self._timer is None:
+            self._timer = gv.Timer(self.interval, self.write)
+
+    async def stop(self) -> None:
+        """Stop the endpoint and the file writes."""
+
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+        if self._timer is not None:
+            self._timer.delete()
+            self._timer = None
+
+    async def write(self) -> None:
+        """Write the metrics to the file and schedule the next write."""
+
+        try:
+            temp_path = self.path + ".tmp"
+
+            with open(temp_path, "w") as f:
+                f.write(self.registry.render())
+
+            # Readers never see a partly written file
+            os.replace(temp_path, self.path)
+        except OSError:
+            logger.exception("failed to write metrics", extra={"path": self.path})
+        finally:
+            self._timer.reschedule(self.interval)
+
+    async def _handle(self, request):
+        """(PRIVATE) Serve the metrics."""
+        from aiohttp import web
+
+        return web.Response(text=self.registry.render(), content_type="text/plain", charset="utf-8")
+
+
+# =====================================================
+# LOGGING
+# =====================================================
+
+# The attributes of every log record, the others were given as extra fields
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def _quote(value) -> str:
+    """(PRIVATE) Return a logfmt value, quoted if it needs to be."""
+
+    text = str(value)
+
+    if not text or any(c in text for c in ' ="\n'):
+        return '"' + text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+    return text
+
+
+class LogfmtFormatter(logging.Formatter):
+    """Formats a log record as a line of key=value pairs."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = [("time", self.formatTime(record)), ("level", record.levelname.lower()),
+                  ("logger", record.name), ("msg", record.getMessage())]
+        fields.extend((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+
+        line = " ".join(f"{key}={_quote(value)}" for key, value in fields)
+
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+
+        return line
+
+
+def configure_logging(level: str = "INFO", path: Optional[str] = None) -> None:
+    """Send the logs of the bot to stderr, or to the file at path,
+    in the logfmt format.
+    """
+
+    handler = logging.FileHandler(path) if path else logging.StreamHandler()
+    handler.setFormatter(LogfmtFormatter())
+
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+
+
+# =====================================================
+# METRICS OF THE BOT
+# =====================================================
+
+REGISTRY = Registry()
+
+RENDER_SECONDS = REGISTRY.register(Histogram(
+    "rise_up_render_seconds", "Seconds spent rendering a card image."))
+UPLOAD_SECONDS = REGISTRY.register(Histogram(
+    "rise_up_upload_seconds", "Seconds spent uploading a card image.", ["mode"]))
+REST_CALL_SECONDS = REGISTRY.register(Histogram(
+    "rise_up_rest_call_seconds", "Seconds spent in a Discord REST call publishing a card.", ["call"]))
+PUBLICATION_CALLS = REGISTRY.register(Histogram(
+    "rise_up_publication_calls", "REST calls made to publish a card event.", buckets=CALL_COUNT_BUCKETS))
+PUBLICATION_FAILURES = REGISTRY.register(Counter(
+    "rise_up_publication_failures_total", "REST calls publishing a card that failed.", ["call"]))
+REACTION_EVENT_SECONDS = REGISTRY.register(Histogram(
+    "rise_up_reaction_event_seconds", "Seconds spent handling a reaction event.", ["event"]))
+CARD_UPDATES = REGISTRY.register(Counter(
+    "rise_up_card_updates_total", "Card updates published."))
+PENDING_TIMERS = REGISTRY.register(Gauge(
+    "rise_up_pending_timers", "Timers waiting for their deadline.", function=lambda: len(gv.TIMERS)))
+ACTIVE_CARDS = REGISTRY.register(Gauge(
+    "rise_up_active_cards", "Rises currently active.", function=lambda: len(gv.CARDS)))
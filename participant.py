@@ -0,0 +1,53 @@
+"""Module containing the Participant class, the record a card
+keeps of each user taking part in its rise.
+"""
+
+from typing import Optional
+import time
+
+
+class Participant:
+    """A participant of a rise. Holds only what the card
+    displays, so that no discord.Member is kept alive.
+
+    Instance Attributes:
+        - user_id: the id of the user
+        - name: the display name of the user
+        - avatar: the avatar hash of the user, or None for
+          the default avatar
+        - status: the status the user reacted with
+        - join_time: the UTC timestamp at which the user joined
+    """
+    __slots__ = ("user_id", "name", "avatar", "status", "join_time")
+
+    user_id: int
+    name: str
+    avatar: Optional[str]
+    status: str
+    join_time: float
+
+    def __init__(self, user_id: int, name: str, avatar: Optional[str], status: str, join_time: float):
+        """Initialize the participant"""
+        self.user_id = user_id
+        self.name = name
+        self.avatar = avatar
+        self.status = status
+        self.join_time = join_time
+
+    def __repr__(self) -> str:
+        return f"Participant({self.user_id}, {self.name!r}, {self.status!r})"
+
+    @classmethod
+    def from_user(cls, user, status: str) -> "Participant":
+        """Return a participant joining now given a discord.Member
+        or discord.User.
+        """
+        return cls(user.id, getattr(user, "display_name", user.name), user.avatar, status, time.time())
+
+    def update(self, user, status: str) -> None:
+        """Take the status and the current name and avatar of a
+        user. The join time is kept.
+        """
+        self.name = getattr(user, "display_name", user.name)
+        self.avatar = user.avatar
+        self.status = status
@@ -0,0 +1,78 @@
+"""Module containing the PendingMessages class. Matches messages
+the bot is about to post with the gateway events announcing them,
+for responses that return no message, like slash command responses.
+
+A message is expected by its channel and its content, which must
+be unique among the pending messages of that channel, like the
+url of a freshly uploaded card image.
+"""
+
+from typing import Dict, Optional, Tuple
+import asyncio
+
+
+class PendingMessages:
+    """An index of messages the bot expects to see posted."""
+
+    def __init__(self):
+        """Initialize the index"""
+        self._pending: Dict[Tuple[int, str], asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        """Return the number of messages still expected."""
+        return len(self._pending)
+
+    def expect(self, channel_id: int, content: str) -> asyncio.Future:
+        """Start expecting a message and return the future it is
+        delivered to. Must be called before the message is sent,
+        since its event may arrive before the send returns.
+        """
+
+        key = (int(channel_id), content)
+        future = asyncio.get_event_loop().create_future()
+        self._pending[key] = future
+
+        return future
+
+    def resolve(self, message) -> bool:
+        """Deliver a posted message to whoever expects it. Return
+        whether the message was expected.
+        """
+
+        # The waiter removes the future, since the message may arrive before it waits
+        future = self._pending.get((message.channel.id, message.content))
+
+        if future is None or future.done():
+            return False
+
+        future.set_result(message)
+        return True
+
+    async def wait(self, channel_id: int, content: str, timeout: float):
+        """Return the expected message once it is posted, or None
+        if it did not arrive within timeout seconds.
+        """
+
+        key = (int(channel_id), content)
+        future = self._pending.get(key)
+
+        if future is None:
+            return None
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+    def discard(self, channel_id: int, content: str) -> Optional[asyncio.Future]:
+        """Stop expecting a message, for instance when sending it failed."""
+
+        future = self._pending.pop((int(channel_id), content), None)
+
+        if future is not None:
+            future.cancel()
+
+        return future
@@ -0,0 +1,76 @@
+"""Module containing the Publication class. Runs the REST calls
+publishing a card as a set of sequences: calls in the same
+sequence run in order, while the sequences run concurrently.
+
+Calls that touch the same message, and so share a Discord rate
+limit route, belong in the same sequence, which keeps them from
+racing each other. Rate limits themselves are waited out by the
+discord.py HTTP client, which tracks every route's bucket.
+"""
+
+from typing import Awaitable, Callable, Dict, Hashable, List, Tuple
+from dataclasses import dataclass
+import asyncio
+import metrics
+
+
+@dataclass
+class Failure:
+    """A call of a publication that raised an error. The calls
+    after it in its sequence were skipped.
+    """
+    sequence: Hashable
+    description: str
+    error: Exception
+
+    def __str__(self) -> str:
+        return f"{self.description} ({self.sequence}): {self.error!r}"
+
+    def get_fields(self) -> dict:
+        """Return the failure as the fields of a log record."""
+        return {"call": self.description, "sequence": str(self.sequence), "error": repr(self.error)}
+
+
+class Publication:
+    """A set of REST calls to run concurrently."""
+
+    def __init__(self):
+        """Initialize an empty publication"""
+        self._sequences: Dict[Hashable, List[Tuple[str, Callable[[], Awaitable]]]] = {}
+
+    def __len__(self) -> int:
+        """Return the number of calls in the publication."""
+        return sum(len(calls) for calls in self._sequences.values())
+
+    def add(self, sequence: Hashable, description: str, call: Callable[[], Awaitable]) -> None:
+        """Run call after the calls already added to the sequence."""
+        self._sequences.setdefault(sequence, []).append((description, call))
+
+    async def run(self) -> List[Failure]:
+        """Run every sequence concurrently and return the calls
+        that failed. A failed call stops the rest of its sequence
+        without affecting the others.
+        """
+
+        failures = []
+        made = 0
+
+        async def run_sequence(sequence: Hashable, calls: List[Tuple[str, Callable[[], Awaitable]]]):
+            nonlocal made
+
+            for description, call in calls:
+                made += 1
+
+                try:
+                    with metrics.REST_CALL_SECONDS.labels(description).time():
+                        await call()
+                except Exception as e:
+                    metrics.PUBLICATION_FAILURES.labels(description).inc()
+                    failures.append(Failure(sequence, description, e))
+                    return
+
+        await asyncio.gather(*(run_sequence(sequence, calls) for sequence, calls in self._sequences.items()))
+
+        metrics.PUBLICATION_CALLS.observe(made)
+
+        return failures
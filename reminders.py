@@ -0,0 +1,125 @@
+"""Module for delivering rise reminders. Mentions are packed into
+as few messages as fit Discord's message limit, and participants
+can also be reminded by direct message.
+
+A rise has one reminder per offset of reminder_offsets, in
+seconds before the rise (e.g. [900, 0] for T-15m and T-0). The
+card keeps a single timer in gv.TIMERS, moved to the next
+reminder each time one is sent.
+"""
+
+from typing import Dict, Iterable, List, Optional
+import asyncio
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+MESSAGE_LIMIT = 2000
+
+
+def get_reminder_offsets(properties: dict) -> List[int]:
+    """Return the reminder offsets of properties.json, earliest
+    reminder first. A rise is always reminded of at T-0 by default.
+    """
+
+    offsets = properties.get("reminder_offsets", [0])
+
+    # A single offset may be given as a number
+    if isinstance(offsets, (int, float)):
+        offsets = [offsets]
+
+    return sorted({max(int(offset), 0) for offset in offsets}, reverse=True) or [0]
+
+
+def format_offset(offset: int) -> str:
+    """Return a short description of a reminder offset, like 15m or 1h30m."""
+
+    hours, minutes = divmod(round(offset / 60), 60)
+
+    if hours and minutes:
+        return f"{hours}h{minutes:02}m"
+
+    if hours:
+        return f"{hours}h"
+
+    return f"{minutes}m"
+
+
+def chunk_mentions(user_ids: Iterable[int], footer: str, limit: int = MESSAGE_LIMIT) -> List[str]:
+    """Return messages mentioning every user, each at most limit
+    characters long. The footer ends the last message.
+    """
+
+    chunks = []
+    chunk = ""
+
+    for user_id in user_ids:
+        mention = f"<@{user_id}> "
+
+        if len(chunk) + len(mention) > limit:
+            chunks.append(chunk.rstrip())
+            chunk = ""
+
+        chunk += mention
+
+    if chunk and len(chunk) + len(footer) > limit:
+        chunks.append(chunk.rstrip())
+        chunk = ""
+
+    chunks.append(chunk + footer)
+
+    return chunks
+
+
+class DirectSender:
+    """A sender of direct messages running at most concurrency
+    deliveries at once. The DM channel of each user is opened
+    once and reused by later reminders.
+
+    Instance Attributes:
+        - concurrency: the maximum number of deliveries in progress
+    """
+    concurrency: int
+
+    def __init__(self, concurrency: int = 4):
+        """Initialize the sender"""
+
+        self.concurrency = concurrency
+
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._channels: Dict[int, int] = {}
+
+    async def send(self, http, user_id: int, content: str) -> bool:
+        """Send content to a user by direct message given the
+        discord.py HTTP client. Return whether it was delivered.
+        """
+        import discord
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        async with self._semaphore:
+            try:
+                channel_id = self._channels.get(user_id)
+
+                if channel_id is None:
+                    data = await http.start_private_message(user_id)
+                    channel_id = self._channels[user_id] = int(data["id"])
+
+                await http.send_message(channel_id, content)
+            except discord.HTTPException as e:
+                # Users may not accept direct messages from the guild's members
+                logger.info("failed to remind user by direct message", extra={"user": user_id, "error": repr(e)})
+                return False
+
+        return True
+
+    async def send_all(self, http, user_ids: Iterable[int], content: str) -> int:
+        """Send content to every user by direct message and return
+        the number of users reached.
+        """
+
+        results = await asyncio.gather(*(self.send(http, user_id, content) for user_id in user_ids))
+        return sum(results)
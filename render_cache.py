@@ -0,0 +1,82 @@
+"""Module containing the RenderCache class. Maps the digest
+of a card's visible state to the cache message holding the
+rendered image, so that repeated states are neither rendered
+nor uploaded again.
+"""
+
+from typing import Callable, List, Optional, Tuple
+from collections import OrderedDict
+import dataclasses
+import hashlib
+import json
+from renderer import CardData
+
+
+def get_card_digest(data: CardData) -> str:
+    """Return a digest of everything drawn on a card."""
+
+    encoded = json.dumps(dataclasses.astuple(data), ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    """A bounded LRU cache of uploaded card images.
+
+    Instance Attributes:
+        - max_size: the maximum number of images kept
+    """
+    max_size: int
+
+    def __init__(self, max_size: int = 8, on_evict: Optional[Callable] = None):
+        """Initialize the cache. on_evict is called with
+        every message that is dropped from the cache.
+        """
+
+        self.max_size = max_size
+        self._on_evict = on_evict
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._entries
+
+    def get(self, digest: str):
+        """Return the cache message stored for digest and mark
+        it as recently used. Return None if it is not cached.
+        """
+
+        if digest not in self._entries:
+            return None
+
+        self._entries.move_to_end(digest)
+        return self._entries[digest]
+
+    def put(self, digest: str, message) -> None:
+        """Store the cache message for digest, evicting the
+        least recently used images past max_size.
+        """
+
+        self._entries[digest] = message
+        self._entries.move_to_end(digest)
+
+        while len(self._entries) > self.max_size:
+            _, evicted = self._entries.popitem(last=False)
+
+            if self._on_evict is not None:
+                self._on_evict(evicted)
+
+    def items(self) -> List[Tuple[str, object]]:
+        """Return the (digest, message) pairs of the cache, least
+        recently used first.
+        """
+        return list(self._entries.items())
+
+    def clear(self) -> List:
+        """Empty the cache and return the messages it held."""
+
+        messages = list(self._entries.values())
+        self._entries.clear()
+
+        return messages
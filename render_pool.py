@@ -0,0 +1,124 @@
+"""Module containing the RenderPool class. Runs card renders
+on a bounded pool of worker threads so that rendering never
+blocks the discord.py event loop.
+"""
+
+from typing import Callable, Hashable, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
+import time
+from renderer import CardData
+import metrics
+
+
+class _Job:
+    """(PRIVATE) A render waiting in the queue."""
+
+    def __init__(self, data: CardData, future: asyncio.Future):
+        self.data = data
+        self.future = future
+
+
+class RenderPool:
+    """A bounded pool of render workers.
+
+    Jobs are queued per key (one key per card). If a card is
+    rendered again while its previous job is still queued, the
+    stale job is replaced by the newer state and both callers
+    receive the newer image. When the queue is full, callers
+    wait until a job is dispatched.
+
+    Instance Attributes:
+        - workers: the number of renders running at once
+        - max_queue: the maximum number of queued jobs
+    """
+    workers: int
+    max_queue: int
+
+    def __init__(self, render: Callable[[CardData], bytes], workers: int = 2, max_queue: int = 32):
+        """Initialize the pool"""
+
+        self.workers = workers
+        self.max_queue = max_queue
+
+        self._render = render
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+        self._queue = OrderedDict()
+        self._running = 0
+        self._space: Optional[asyncio.Condition] = None
+
+    @property
+    def queued(self) -> int:
+        """Return the number of jobs waiting for a worker."""
+        return len(self._queue)
+
+    async def render(self, key: Hashable, data: CardData) -> Tuple[CardData, bytes]:
+        """Render data on a worker and return the rendered
+        state together with the PNG encoded image. The returned
+        state is newer than data if the job was superseded.
+        """
+
+        job = self._queue.get(key)
+
+        if job is not None:
+            # Shed the stale job, the newest state is rendered instead
+            job.data = data
+            return await asyncio.shield(job.future)
+
+        if self._space is None:
+            self._space = asyncio.Condition()
+
+        async with self._space:
+            await self._space.wait_for(lambda: len(self._queue) < self.max_queue)
+
+        # The card may have been queued while waiting for space
+        job = self._queue.get(key)
+
+        if job is not None:
+            job.data = data
+        else:
+            job = _Job(data, asyncio.get_event_loop().create_future())
+            self._queue[key] = job
+            self._dispatch()
+
+        return await asyncio.shield(job.future)
+
+    def shutdown(self) -> None:
+        """Stop the workers once running renders finish."""
+        self._executor.shutdown(wait=False)
+
+    def _dispatch(self) -> None:
+        """(PRIVATE) Start queued jobs on idle workers."""
+
+        loop = asyncio.get_event_loop()
+
+        while self._running < self.workers and self._queue:
+            _, job = self._queue.popitem(last=False)
+            self._running += 1
+
+            data = job.data
+            task = loop.run_in_executor(self._executor, self._render, data)
+            task.add_done_callback(partial(self._finished, job, data, time.perf_counter()))
+
+    def _finished(self, job: _Job, data: CardData, started: float, task: asyncio.Future) -> None:
+        """(PRIVATE) Resolve a finished job and start the next one."""
+
+        self._running -= 1
+        metrics.RENDER_SECONDS.observe(time.perf_counter() - started)
+
+        if not job.future.done():
+            if task.exception() is not None:
+                job.future.set_exception(task.exception())
+            else:
+                job.future.set_result((data, task.result()))
+
+        self._dispatch()
+        asyncio.ensure_future(self._notify_space())
+
+    async def _notify_space(self) -> None:
+        """(PRIVATE) Wake callers waiting for queue space."""
+
+        async with self._space:
+            self._space.notify_all()
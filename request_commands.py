@@ -2,16 +2,33 @@
 to generate the slash commands needed.
 
 Run this file to update the slash commands for your bot
-given settings in properties.json. It may take several hours
-for it to fully update.
+given settings in properties.json. Global commands may take
+up to an hour to update, guild commands update instantly.
+
+The registered commands are fetched first and compared with
+the ones defined here. If anything differs, every command is
+written in a single bulk overwrite. Should that fail, only the
+changed commands are sent, concurrently over pooled connections.
+
+Usage:
+    python request_commands.py [--guild GUILD_ID] [--dry-run]
 """
 
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import time
 import requests
-from global_vars import load_json
+from requests.adapters import HTTPAdapter
+
 
-PROPERTIES = load_json("properties.json")
+API_BASE = "https://discord.com/api/v8"
+MAX_WORKERS = 8
+MAX_RETRIES = 3
 
-url = PROPERTIES['bot_commands_url']
+# The type Discord gives a command registered without one
+CHAT_INPUT_COMMAND = 1
 
 rise_up_json = {
     "name": "rise",
@@ -30,7 +47,7 @@ rise_up_json = {
                 },
                 {
                     "name": "time",
-                    "description": "The time for the rise (ex. 8pm, 9:01am)",
+                    "description": "The time for the rise (ex. 8pm, 17:30, in 20m, tomorrow 9pm)",
                     "type": 3,
                     "required": True
                 },
@@ -56,7 +73,7 @@ change_time_json = {
             "options": [
                 {
                     "name": "time",
-                    "description": "The new time for the rise (ex. 8pm, 9:01am)",
+                    "description": "The new time for the rise (ex. 8pm, 17:30, in 20m, tomorrow 9pm)",
                     "type": 3,
                     "required": True
                 }
@@ -117,16 +134,248 @@ give_json = {
     ]
 }
 
-
-headers = {
-    "Authorization": f"Bot {PROPERTIES['token']}"
+timezone_json = {
+    "name": "timezone",
+    "description": "Set the timezone rise times are given in",
+    "options": [
+        {
+            "name": "set",
+            "description": "Set your own timezone",
+            "type": 1,
+            "options": [
+                {
+                    "name": "zone",
+                    "description": "The name of your timezone (ex. America/Toronto, Europe/London)",
+                    "type": 3,
+                    "required": True
+                }
+            ]
+        },
+        {
+            "name": "server",
+            "description": "(ADMIN) Set the default timezone of this server",
+            "type": 1,
+            "options": [
+                {
+                    "name": "zone",
+                    "description": "The name of the timezone (ex. America/Toronto, Europe/London)",
+                    "type": 3,
+                    "required": True
+                }
+            ]
+        },
+        {
+            "name": "show",
+            "description": "Show the timezone your rise times are given in",
+            "type": 1,
+            "options": []
+        }
+    ]
 }
 
-# Send Requests to Add Commands To Server
-# r1 = requests.post(url, headers=headers, json=rise_up_json)
-# r2 = requests.post(url, headers=headers, json=change_time_json)
-# r3 = requests.post(url, headers=headers, json=cancel_json)
-# r4 = requests.post(url, headers=headers, json=close_json)
-# r5 = requests.post(url, headers=headers, json=force_setup_json)
-# r6 = requests.post(url, headers=headers, json=usurp_json)
-r7 = requests.post(url, headers=headers, json=give_json)
+
+COMMANDS = [
+    rise_up_json,
+    change_time_json,
+    cancel_json,
+    close_json,
+    force_setup_json,
+    usurp_json,
+    give_json,
+    timezone_json
+]
+
+
+def load_json(path):
+    """Load and return a json file given a path."""
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def get_commands_url(api_base: str, application_id: str, guild_id: Optional[str] = None) -> str:
+    """Return the url of the global commands of an
+    application, or of its commands in a guild.
+    """
+
+    if guild_id is None:
+        return f"{api_base}/applications/{application_id}/commands"
+
+    return f"{api_base}/applications/{application_id}/guilds/{guild_id}/commands"
+
+
+def normalize_command(command: dict, top_level: bool = True) -> dict:
+    """Return the parts of a command that are defined here,
+    with the defaults Discord leaves out removed and the ones
+    it fills in added, so that a defined and a registered
+    command compare equal.
+    """
+
+    normalized = {"name": command["name"], "description": command["description"]}
+
+    if top_level:
+        normalized["type"] = command.get("type", CHAT_INPUT_COMMAND)
+    elif "type" in command:
+        normalized["type"] = command["type"]
+
+    if command.get("required"):
+        normalized["required"] = True
+
+    if command.get("choices"):
+        normalized["choices"] = command["choices"]
+
+    if command.get("options"):
+        normalized["options"] = [normalize_command(option, top_level=False)
+                                 for option in command["options"]]
+
+    return normalized
+
+
+def get_diff(defined: List[dict], registered: List[dict]) -> Tuple[List[dict], List[dict], List[dict]]:
+    """Return the commands to create, the commands to update
+    and the registered commands to delete.
+    """
+
+    registered_by_name = {command["name"]: command for command in registered}
+    defined_names = {command["name"] for command in defined}
+
+    created = []
+    updated = []
+
+    for command in defined:
+        existing = registered_by_name.get(command["name"])
+
+        if existing is None:
+            created.append(command)
+        elif normalize_command(existing) != normalize_command(command):
+            updated.append(command)
+
+    deleted = [command for command in registered if command["name"] not in defined_names]
+
+    return created, updated, deleted
+
+
+class CommandClient:
+    """A client for the application commands endpoint.
+
+    Instance Attributes:
+        - url: the url of the commands
+        - session: the session pooling the connections
+    """
+    url: str
+    session: requests.Session
+
+    def __init__(self, url: str, token: str):
+        """Initialize the client"""
+
+        self.url = url
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bot {token}"
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=MAX_WORKERS))
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=MAX_WORKERS))
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request, waiting out rate limits, and
+        raise requests.HTTPError if it fails.
+        """
+
+        for _ in range(MAX_RETRIES):
+            response = self.session.request(method, url, **kwargs)
+
+            if response.status_code != 429:
+                break
+
+            time.sleep(float(response.json().get("retry_after", 1)))
+
+        response.raise_for_status()
+        return response
+
+    def fetch(self) -> List[dict]:
+        """Return the registered commands."""
+        return self.request("GET", self.url).json()
+
+    def overwrite(self, commands: List[dict]) -> None:
+        """Replace every registered command in a single call."""
+        self.request("PUT", self.url, json=commands)
+
+    def apply(self, created: List[dict], updated: List[dict], deleted: List[dict]) -> List[str]:
+        """Send each change as a request of its own, concurrently.
+        Return the errors of the requests that failed.
+        """
+
+        # Posting a command with the name of a registered one updates it
+        jobs = [("POST", self.url, command) for command in created + updated]
+        jobs += [("DELETE", f"{self.url}/{command['id']}", None) for command in deleted]
+
+        def send(job) -> Optional[str]:
+            method, url, command = job
+
+            try:
+                self.request(method, url, json=command)
+            except requests.RequestException as e:
+                return f"{method} {url}: {e}"
+
+            return None
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            return [error for error in executor.map(send, jobs) if error is not None]
+
+
+def sync_commands(client: CommandClient, commands: List[dict], dry_run: bool = False) -> Dict[str, list]:
+    """Bring the registered commands in line with commands
+    and return the changes that were made.
+    """
+
+    created, updated, deleted = get_diff(commands, client.fetch())
+    changes = {"created": created, "updated": updated, "deleted": deleted, "errors": []}
+
+    if dry_run or not (created or updated or deleted):
+        return changes
+
+    try:
+        client.overwrite(commands)
+    except requests.RequestException as e:
+        print(f"|| Bulk overwrite failed ({e}), sending changes individually...")
+        changes["errors"] = client.apply(created, updated, deleted)
+
+    return changes
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    """Run the registration tool and return its exit code."""
+
+    properties = load_json("properties.json")
+
+    parser = argparse.ArgumentParser(description="Register the slash commands of the bot.")
+    parser.add_argument("--guild", help="register the commands in this guild instead of globally")
+    parser.add_argument("--dry-run", action="store_true", help="only show what would change")
+    parser.add_argument("--api-base", default=properties.get("api_base", API_BASE),
+                        help="the base url of the Discord API")
+    parser.add_argument("--application-id", default=properties.get("application_id"),
+                        help="the id of the bot application")
+    options = parser.parse_args(args)
+
+    if options.application_id is not None:
+        url = get_commands_url(options.api_base, options.application_id, options.guild)
+    elif options.guild is None:
+        url = properties["bot_commands_url"]
+    else:
+        parser.error("--guild needs an application id, set application_id in properties.json")
+
+    client = CommandClient(url, properties["token"])
+    changes = sync_commands(client, COMMANDS, dry_run=options.dry_run)
+
+    for change in ("created", "updated", "deleted"):
+        for command in changes[change]:
+            print(f"{change}: /{command['name']}")
+
+    for error in changes["errors"]:
+        print("|| Failed:", error)
+
+    if not any(changes[change] for change in ("created", "updated", "deleted")):
+        print("The commands are up to date.")
+
+    return 1 if changes["errors"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,294 @@
+"""Module containing the RiseStore class. Stores the active
+rises in an SQLite database in WAL mode so that cards, their
+participants, their timers and their images in the cache channel
+survive a restart.
+
+Every change is written as a small transaction of its own,
+instead of rewriting the whole state.
+"""
+
+from __future__ import annotations
+from typing import Dict, List, Optional
+from dataclasses import dataclass, field
+import sqlite3
+from participant import Participant
+import global_vars as gv
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cards (
+    card_id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    forwarded_channel_id INTEGER,
+    forwarded_message_id INTEGER,
+    author_id INTEGER NOT NULL,
+    author_name TEXT NOT NULL,
+    author_avatar TEXT,
+    game_name TEXT NOT NULL,
+    game_img TEXT NOT NULL,
+    slots INTEGER NOT NULL,
+    target_time REAL NOT NULL,
+    notify_at REAL,
+    close_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS players (
+    card_id INTEGER NOT NULL REFERENCES cards (card_id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    avatar TEXT,
+    status TEXT NOT NULL,
+    join_time REAL NOT NULL,
+    PRIMARY KEY (card_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS reactions (
+    card_id INTEGER NOT NULL REFERENCES cards (card_id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    emoji TEXT NOT NULL,
+    PRIMARY KEY (card_id, user_id, message_id)
+);
+
+CREATE TABLE IF NOT EXISTS cache_images (
+    card_id INTEGER NOT NULL REFERENCES cards (card_id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    message_id INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    PRIMARY KEY (card_id, position)
+);
+"""
+
+
+class StoredUser:
+    """A class imitating a discord.Member for users restored
+    from the store, holding what a card displays.
+
+    Instance Attributes:
+        - id: the id of the user
+        - name: the name of the user
+        - avatar: the avatar hash of the user
+    """
+    __slots__ = ("id", "name", "avatar")
+
+    bot = False
+
+    def __init__(self, user_id: int, name: str, avatar: Optional[str]):
+        """Initialize the stored user"""
+        self.id = user_id
+        self.name = name
+        self.avatar = avatar
+
+
+class PartialMessage:
+    """A class imitating a discord.Message for card messages
+    restored from the store. Supports the operations a card
+    performs on its messages without fetching them.
+
+    Instance Attributes:
+        - id: the id of the message
+        - channel: the channel of the message
+    """
+    __slots__ = ("id", "channel")
+
+    def __init__(self, channel, message_id: int):
+        """Initialize the partial message"""
+        self.id = message_id
+        self.channel = channel
+
+    async def edit(self, *, content: str):
+        await gv.CLIENT.http.edit_message(self.channel.id, self.id, content=content)
+
+    async def delete(self):
+        await gv.CLIENT.http.delete_message(self.channel.id, self.id)
+
+    async def add_reaction(self, emoji: str):
+        await gv.CLIENT.http.add_reaction(self.channel.id, self.id, emoji)
+
+    async def remove_reaction(self, emoji: str, member):
+        await gv.CLIENT.http.remove_reaction(self.channel.id, self.id, emoji, member.id)
+
+
+class CacheImage:
+    """A class imitating a discord.Message for cache channel
+    messages restored from the store. The message is its own
+    attachment, as only the id and image url are kept.
+
+    Instance Attributes:
+        - id: the id of the cache message
+        - url: the url of the attached image
+        - digest: the digest of the card state in the image
+    """
+    __slots__ = ("id", "url", "digest")
+
+    def __init__(self, message_id: int, url: str, digest: str):
+        """Initialize the cache image"""
+        self.id = message_id
+        self.url = url
+        self.digest = digest
+
+    @property
+    def attachments(self) -> List[CacheImage]:
+        return [self]
+
+
+@dataclass
+class StoredCard:
+    """A stored card with its participants, reactions and the
+    cache images of its render cache, least recently used first.
+
+    Times are UTC timestamps. notify_at is the time of the next
+    reminder, or None once every reminder was sent.
+    """
+    card_id: int
+    guild_id: int
+    channel_id: int
+    forwarded_channel_id: Optional[int]
+    forwarded_message_id: Optional[int]
+    author_id: int
+    author_name: str
+    author_avatar: Optional[str]
+    game_name: str
+    game_img: str
+    slots: int
+    target_time: float
+    notify_at: Optional[float]
+    close_at: float
+    players: List[Participant] = field(default_factory=list)
+    reactions: Dict[int, Dict[int, str]] = field(default_factory=dict)
+    cache_images: List[CacheImage] = field(default_factory=list)
+
+
+class RiseStore:
+    """A durable store of the active rises.
+
+    Instance Attributes:
+        - path: the path of the database file
+    """
+    path: str
+
+    def __init__(self, path: str):
+        """Open the database and create the schema"""
+
+        self.path = path
+
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Close the database."""
+        self._db.close()
+
+    def save_card(self, card) -> None:
+        """Insert or update the row of a card."""
+
+        forwarded = card.forwarded_message
+
+        with self._db:
+            # Upsert rather than replace, which would cascade to the players
+            self._db.execute(
+                "INSERT INTO cards VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (card_id) DO UPDATE SET "
+                "forwarded_channel_id = excluded.forwarded_channel_id, "
+                "forwarded_message_id = excluded.forwarded_message_id, "
+                "author_id = excluded.author_id, author_name = excluded.author_name, "
+                "author_avatar = excluded.author_avatar, target_time = excluded.target_time, "
+                "notify_at = excluded.notify_at, close_at = excluded.close_at",
+                (card.message.id, card.guild.id, card.channel.id,
+                 forwarded.channel.id if forwarded is not None else None,
+                 forwarded.id if forwarded is not None else None,
+                 card.author.id, card.author.name, card.author.avatar,
+                 card.game.name, card.game.img_path, card.slots,
+                 card.target_time.timestamp(), card.get_notify_at(), card.get_close_at()))
+
+    def delete_card(self, card_id: int) -> None:
+        """Delete a card with its players, reactions and cache images."""
+
+        with self._db:
+            self._db.execute("DELETE FROM cards WHERE card_id = ?", (card_id,))
+
+    def save_player(self, card, user_id: str) -> None:
+        """Insert or update a player of a card and their reactions."""
+
+        player = card.players[user_id]
+
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO players VALUES (?, ?, ?, ?, ?, ?)",
+                (card.message.id, player.user_id, player.name, player.avatar,
+                 player.status, player.join_time))
+            self._write_reactions(card, user_id)
+
+    def delete_player(self, card, user_id: str) -> None:
+        """Delete a player of a card and their reactions."""
+
+        with self._db:
+            self._db.execute("DELETE FROM players WHERE card_id = ? AND user_id = ?",
+                             (card.message.id, int(user_id)))
+            self._write_reactions(card, user_id)
+
+    def save_players(self, card) -> None:
+        """Replace every player and reaction of a card."""
+
+        with self._db:
+            self._db.execute("DELETE FROM players WHERE card_id = ?", (card.message.id,))
+            self._db.execute("DELETE FROM reactions WHERE card_id = ?", (card.message.id,))
+
+            self._db.executemany(
+                "INSERT INTO players VALUES (?, ?, ?, ?, ?, ?)",
+                [(card.message.id, player.user_id, player.name, player.avatar,
+                  player.status, player.join_time) for player in card.players.values()])
+
+            for user_id in card.reactions:
+                self._write_reactions(card, user_id, replace=False)
+
+    def save_cache_images(self, card) -> None:
+        """Replace the cache images of a card with the messages
+        held by its render cache.
+        """
+
+        with self._db:
+            self._db.execute("DELETE FROM cache_images WHERE card_id = ?", (card.message.id,))
+            self._db.executemany(
+                "INSERT INTO cache_images VALUES (?, ?, ?, ?, ?)",
+                [(card.message.id, position, digest, message.id, message.attachments[0].url)
+                 for position, (digest, message) in enumerate(card.render_cache.items())])
+
+    def load(self) -> List[StoredCard]:
+        """Return every stored card."""
+
+        cards = {row[0]: StoredCard(*row) for row in self._db.execute("SELECT * FROM cards")}
+
+        for row in self._db.execute("SELECT * FROM players ORDER BY card_id, join_time"):
+            if row[0] in cards:
+                cards[row[0]].players.append(Participant(*row[1:]))
+
+        for card_id, user_id, message_id, emoji in self._db.execute("SELECT * FROM reactions"):
+            if card_id in cards:
+                cards[card_id].reactions.setdefault(user_id, {})[message_id] = emoji
+
+        for card_id, _, digest, message_id, url in self._db.execute(
+                "SELECT * FROM cache_images ORDER BY card_id, position"):
+            if card_id in cards:
+                cards[card_id].cache_images.append(CacheImage(message_id, url, digest))
+
+        return list(cards.values())
+
+    def _write_reactions(self, card, user_id: str, replace: bool = True) -> None:
+        """(PRIVATE) Write the reactions of a user on a card.
+        Must be called inside a transaction.
+        """
+
+        if replace:
+            self._db.execute("DELETE FROM reactions WHERE card_id = ? AND user_id = ?",
+                             (card.message.id, int(user_id)))
+
+        self._db.executemany(
+            "INSERT INTO reactions VALUES (?, ?, ?, ?)",
+            [(card.message.id, int(user_id), message_id, emoji)
+             for message_id, emoji in card.reactions.get(user_id, {}).items()])
@@ -3,6 +3,8 @@ parameters given by the /rise up command.
 """
 
 import datetime
+import re
+import time
 import global_vars as gv
 from typing import Optional
 from dataclasses import dataclass
@@ -15,12 +17,12 @@ class Game:
     img_path: str
 
 
-def get_datetime_now() -> datetime.datetime:
+def get_datetime_now(tz: Optional[datetime.tzinfo] = None) -> datetime.datetime:
     """Return a timezone adjusted datetime.datetime
-    value representing now.
+    value representing now, in tz or the default timezone.
     """
 
-    return datetime.datetime.now(tz=gv.TIMEZONE)
+    return datetime.datetime.now(tz=tz or gv.TIMEZONE)
 
 
 def get_time_until(target: datetime.datetime):
@@ -30,27 +32,45 @@ def get_time_until(target: datetime.datetime):
     Preconditions:
         - get_datetime_now() < target
     """
-    return (target - get_datetime_now()).total_seconds()
+    # Timestamps are absolute, unlike the difference of two
+    # datetimes sharing a zone, which ignores DST changes
+    return target.timestamp() - time.time()
 
 
-def get_next_time(hour: int, minute: int):
-    """Return the next datetime.datetime occurrence
-    of an hour and minute.
+def get_wall_time(date: datetime.date, hour: int, minute: int,
+                  tz: datetime.tzinfo) -> datetime.datetime:
+    """Return the datetime.datetime at an hour and minute of
+    a date in tz. Times skipped by a DST change are moved
+    forward by the length of the change.
+    """
+
+    local = datetime.datetime.combine(date, datetime.time(hour, minute), tzinfo=tz)
+    return local.astimezone(datetime.timezone.utc).astimezone(tz)
 
 
-    Parameter time must be in format:
-        time: 'HH:MMpm' or 'HH:MMam'
+def get_next_time(hour: int, minute: int, tz: Optional[datetime.tzinfo] = None):
+    """Return the next datetime.datetime occurrence
+    of an hour and minute.
     """
 
-    now = get_datetime_now()
-    target = now.replace(hour=hour, minute=minute, second=0)
+    now = get_datetime_now(tz)
+    target = get_wall_time(now.date(), hour, minute, now.tzinfo)
 
-    if target < now:
-        target = target + datetime.timedelta(days=1)
+    if target.timestamp() < now.timestamp():
+        target = get_wall_time(now.date() + datetime.timedelta(days=1), hour, minute, now.tzinfo)
 
     return target
 
 
+def get_time_on_day(hour: int, minute: int, days: int, tz: Optional[datetime.tzinfo] = None):
+    """Return the datetime.datetime of an hour and
+    minute a number of days from today.
+    """
+
+    now = get_datetime_now(tz)
+    return get_wall_time(now.date() + datetime.timedelta(days=days), hour, minute, now.tzinfo)
+
+
 def datetime_to_short_str(date_time: datetime.datetime):
     hour = (((date_time.hour - 1) % 12) + 1)
     return str(hour) + date_time.strftime(':%M%p').lower()
@@ -62,11 +82,10 @@ def get_game(game_name: str) -> Game:
     given a game_name str.
     """
 
-    games = gv.GAMES
+    match = gv.GAME_RESOLVER.resolve(game_name)
 
-    if game_name in games:
-        name = games[game_name]['name']
-        img_path = games[game_name]['img']
+    if match is not None:
+        name, img_path = match
     else:
         name = game_name
         img_path = ''
@@ -74,48 +93,140 @@ def get_game(game_name: str) -> Game:
     return Game(name=name, img_path=img_path)
 
 
-def get_datetime_from_time_str(time_str) -> Optional[datetime.datetime]:
-    """Return a datetime.datetime object given
-    a time_str. Return None if it was unsuccessful.
+@dataclass
+class TimeParseResult:
+    """The result of parsing a time string. Exactly one of
+    time and error is set.
+    """
+    time: Optional[datetime.datetime] = None
+    error: Optional[str] = None
+
+
+# An optional day word, as in "tomorrow 9pm" or "today at 5pm"
+_DAY = r"(?:(?P<day>today|tonight|tomorrow|tmrw?)\s+(?:at\s+)?)?"
+
+_DAY_OFFSETS = {
+    "today": 0,
+    "tonight": 0,
+    "tomorrow": 1,
+    "tmr": 1,
+    "tmrw": 1
+}
+
+_NAMED_TIMES = {
+    "noon": (12, 0),
+    "midnight": (0, 0)
+}
+
+
+def _parse_relative(match, tz: datetime.tzinfo) -> TimeParseResult:
+    """(PRIVATE) Parse "in 20m", "in 1h30m" or "in 2 hours"."""
+
+    hours, minutes = match.group("hours"), match.group("minutes")
+
+    if hours is None and minutes is None:
+        return TimeParseResult(error="Say how long from now, like in 20m or in 1h30m.")
+
+    delta = datetime.timedelta(hours=int(hours or 0), minutes=int(minutes or 0))
+
+    if delta > datetime.timedelta(days=7):
+        return TimeParseResult(error="Rises can be at most a week away.")
+
+    # Offsets are added in UTC so that they span DST changes correctly
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    return TimeParseResult(time=(now + delta).astimezone(tz))
+
 
-    The time_str must be in the format HH:MMpm or HH:MMam
+def _parse_12h(match, tz: datetime.tzinfo) -> TimeParseResult:
+    """(PRIVATE) Parse "5pm", "5 PM" or "5:30am"."""
+
+    hour, minute = int(match.group("hour")), int(match.group("minute") or 0)
+
+    if not 1 <= hour <= 12:
+        return TimeParseResult(error=f"{hour} is not an hour on a 12-hour clock.")
+
+    hour = hour % 12
+
+    if match.group("meridiem") == "p":
+        hour += 12
+
+    return _parse_clock(hour, minute, match.group("day"), tz)
+
+
+def _parse_24h(match, tz: datetime.tzinfo) -> TimeParseResult:
+    """(PRIVATE) Parse "17:30"."""
+
+    hour, minute = int(match.group("hour")), int(match.group("minute"))
+
+    if not 0 <= hour <= 23:
+        return TimeParseResult(error=f"{hour} is not an hour on a 24-hour clock.")
+
+    return _parse_clock(hour, minute, match.group("day"), tz)
+
+
+def _parse_named(match, tz: datetime.tzinfo) -> TimeParseResult:
+    """(PRIVATE) Parse "noon" or "midnight"."""
+
+    hour, minute = _NAMED_TIMES[match.group("name")]
+    return _parse_clock(hour, minute, match.group("day"), tz)
+
+
+def _parse_clock(hour: int, minute: int, day: Optional[str], tz: datetime.tzinfo) -> TimeParseResult:
+    """(PRIVATE) Return the result for a time of day, on the
+    given day word or at its next occurrence.
     """
 
-    # Check length of string (minimum 3 chars)
-    if len(time_str) < 3:
-        return None
+    if not 0 <= minute <= 59:
+        return TimeParseResult(error=f"{minute} is not a valid minute.")
 
-    # Check Legal Characters
-    legal_time_chars = ":0123456789"
-    for char in time_str[:-2]:
-        if char not in legal_time_chars:
-            return None
+    if day is None:
+        return TimeParseResult(time=get_next_time(hour=hour, minute=minute, tz=tz))
 
-    # Ensure that string ends in am or pm
-    am_pm = time_str[-2:]
-    if am_pm != 'am' and am_pm != 'pm':
-        return None
+    target = get_time_on_day(hour=hour, minute=minute, days=_DAY_OFFSETS[day], tz=tz)
 
-    if ':' in time_str:
-        time_split = time_str[:-2].split(':')
+    if target.timestamp() < time.time():
+        return TimeParseResult(error="That time has already passed today.")
 
-        # Ensure that there are two elements in the split string
-        if len(time_split) != 2:
-            return None
+    return TimeParseResult(time=target)
 
-        hr = int(time_split[0])
-        mins = int(time_split[1])
 
-        if am_pm == 'pm':
-            hr = (hr + 12) % 24
+# Grammar of time strings, tried in order. Each pattern must match the whole string.
+_TIME_GRAMMAR = [
+    (re.compile(r"in\s+(?:(?P<hours>\d{1,3})\s*h(?:ours?|rs?)?)?\s*"
+                r"(?:(?P<minutes>\d{1,4})\s*m(?:ins?|inutes?)?)?"), _parse_relative),
+    (re.compile(_DAY + r"(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<meridiem>[ap])\.?m?\.?"), _parse_12h),
+    (re.compile(_DAY + r"(?P<hour>\d{1,2}):(?P<minute>\d{2})"), _parse_24h),
+    (re.compile(_DAY + r"(?P<name>noon|midnight)"), _parse_named)
+]
 
-        return get_next_time(hour=hr, minute=mins)
 
-    else:
-        hr = int(time_str[:-2])
-        if am_pm == 'pm':
-            hr += 12
+def parse_time_str(time_str: str, tz: Optional[datetime.tzinfo] = None) -> TimeParseResult:
+    """Parse a time string, given in tz or the default
+    timezone, into a TimeParseResult.
+
+    Accepted forms include:
+        - 12-hour times: 5pm, 5 PM, 9:01am
+        - 24-hour times: 17:30
+        - relative times: in 20m, in 1h30m, in 2 hours
+        - day words: tomorrow 9pm, today at 17:30, tomorrow noon
+    """
+
+    normalized = " ".join(time_str.lower().split())
+
+    for pattern, parse in _TIME_GRAMMAR:
+        match = pattern.fullmatch(normalized)
 
-        return get_next_time(hour=hr, minute=0)
+        if match is not None:
+            return parse(match, tz or gv.TIMEZONE)
 
+    return TimeParseResult(error=f"'{time_str}' is not a time I understand.")
+
+
+def get_datetime_from_time_str(time_str, tz: Optional[datetime.tzinfo] = None) -> Optional[datetime.datetime]:
+    """Return a datetime.datetime object given
+    a time_str. Return None if it was unsuccessful.
+
+    See parse_time_str for the accepted formats.
+    """
 
+    return parse_time_str(time_str, tz).time
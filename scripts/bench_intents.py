@@ -0,0 +1,112 @@
+"""Script comparing the memory held by the bot's client under
+each intents profile, on a simulated large guild.
+
+The guild is built by discord.py's own gateway parser from a
+GUILD_CREATE payload carrying every member, as the member chunks
+requested at startup would deliver them. Memory is measured with
+tracemalloc around the parse.
+
+Usage:
+    python scripts/bench_intents.py [--members N] [--channels N]
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from global_vars import App
+
+
+PROFILES = ("all", "minimal")
+GUILD_ID = 81384788765712384
+
+
+def get_guild_payload(members: int, channels: int) -> dict:
+    """Return the GUILD_CREATE payload of a guild with the given
+    numbers of members and text channels.
+    """
+
+    return {
+        "id": str(GUILD_ID),
+        "name": "Large Guild",
+        "owner_id": str(GUILD_ID + 1),
+        "member_count": members,
+        "large": True,
+        "roles": [{"id": str(GUILD_ID), "name": "@everyone", "permissions": "104324673",
+                   "position": 0, "color": 0, "hoist": False, "managed": False, "mentionable": False}],
+        "channels": [{"id": str(GUILD_ID + 10 + i), "type": 0, "name": f"channel-{i}", "position": i,
+                      "permission_overwrites": []} for i in range(channels)],
+        "members": [{"user": {"id": str(GUILD_ID + 1000 + i), "username": f"member{i}",
+                              "discriminator": f"{i % 10000:04}", "avatar": f"{i:032x}"},
+                     "roles": [], "joined_at": "2020-11-01T12:00:00.000000+00:00",
+                     "deaf": False, "mute": False} for i in range(members)],
+        "presences": [],
+        "emojis": [],
+        "voice_states": [],
+        "features": []
+    }
+
+
+async def measure(profile: str, payload: dict) -> dict:
+    """Parse the guild with a client of the given profile and
+    return what it kept.
+    """
+    import discord
+
+    client = discord.Client(**App.get_client_options(profile))
+    state = client._connection
+
+    # Whether the client would request the members at startup, before any arrived
+    unchunked = discord.Guild(data=dict(payload, members=[]), state=state)
+    chunks = state._guild_needs_chunking(unchunked)
+
+    start = time.perf_counter()
+    state._add_guild_from_data(payload)
+    elapsed = time.perf_counter() - start
+    state.clear()
+
+    gc.collect()
+    tracemalloc.start()
+    guild = state._add_guild_from_data(payload)
+    gc.collect()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {"profile": profile, "members": len(guild.members), "chunks": chunks,
+              "intents": client.intents.value, "memory": held, "seconds": elapsed}
+
+    await client.close()
+
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare the memory of the intents profiles.")
+    parser.add_argument("--members", type=int, default=50000, help="the members of the guild")
+    parser.add_argument("--channels", type=int, default=200, help="the text channels of the guild")
+    options = parser.parse_args()
+
+    payload = get_guild_payload(options.members, options.channels)
+
+    print(f"a guild of {options.members} members and {options.channels} channels")
+    print(f"{'profile':>8} {'intents':>8} {'chunks':>7} {'cached members':>15} {'memory':>10} {'parse':>8}")
+
+    for profile in PROFILES:
+        result = asyncio.run(measure(profile, payload))
+
+        print(f"{result['profile']:>8} {result['intents']:>8} {str(result['chunks']):>7} "
+              f"{result['members']:>15} {result['memory'] / 2 ** 20:>7.1f} MB "
+              f"{result['seconds'] * 1000:>5.0f} ms")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
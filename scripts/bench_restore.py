@@ -0,0 +1,133 @@
+"""Script timing the recovery of the active rises at startup,
+against a store seeded with many rises.
+
+The rises are written through RiseStore like the bot writes them,
+with their players, reactions and cache images, and restored by
+restore_cards() with a stub client knowing every channel.
+
+Usage:
+    python scripts/bench_restore.py [--rises N] [--players N]
+"""
+
+import argparse
+import asyncio
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import global_vars as gv
+
+
+EMOJI = "✅"
+
+
+def get_rise(index: int, players: int, target: float) -> SimpleNamespace:
+    """Return a card-like rise as the store reads it."""
+    from participant import Participant
+
+    guild_id = (index + 1) << 22
+    message = SimpleNamespace(id=guild_id + 1)
+    cache_image = SimpleNamespace(id=guild_id + 3, attachments=[SimpleNamespace(url=f"https://cdn.example/{index}.jpg")])
+
+    return SimpleNamespace(
+        message=message, guild=SimpleNamespace(id=guild_id), channel=SimpleNamespace(id=guild_id + 2),
+        forwarded_message=None, author=SimpleNamespace(id=index + 1, name=f"author {index}", avatar=None),
+        game=SimpleNamespace(name="Valorant", img_path="assets/background/Valorant.png"), slots=players + 1,
+        target_time=datetime.datetime.fromtimestamp(target, datetime.timezone.utc),
+        get_notify_at=lambda: target, get_close_at=lambda: target + 10800,
+        players={str(user_id): Participant(user_id, f"player {user_id}", None, "Available", target - 60)
+                 for user_id in range(10 ** 6, 10 ** 6 + players)},
+        reactions={str(user_id): {message.id: EMOJI} for user_id in range(10 ** 6, 10 ** 6 + players)},
+        render_cache=SimpleNamespace(items=lambda: [("digest", cache_image)]))
+
+
+def seed_store(path: str, rises: int, players: int) -> tuple:
+    """Store rises with their players and return the seconds per
+    card upsert and per player upsert.
+    """
+    from rise_store import RiseStore
+
+    store = RiseStore(path)
+    target = time.time() + 3600
+    card_seconds = player_seconds = 0
+
+    for index in range(rises):
+        rise = get_rise(index, players, target)
+
+        start = time.perf_counter()
+        store.save_card(rise)
+        card_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        for user_id in rise.players:
+            store.save_player(rise, user_id)
+        player_seconds += time.perf_counter() - start
+
+        store.save_cache_images(rise)
+
+    store.close()
+
+    return card_seconds / rises, player_seconds / (rises * players)
+
+
+async def restore(data_dir: str) -> tuple:
+    """Restore the stored rises and return the seconds taken to
+    load the store and to restore every rise, the rises restored
+    and the timers armed.
+    """
+    import card
+
+    gv.APP.root_dir = data_dir
+    gv.APP.__dict__["properties"] = {
+        "timezone": "UTC", "close_rise_delay": 10800, "render_cache_size": 8,
+        "store_path": "rises.db", "reminder_offsets": [0], "reaction_reconcile_interval": 900
+    }
+    gv.CLIENT = SimpleNamespace(get_channel=lambda channel_id: SimpleNamespace(
+        id=channel_id, guild=SimpleNamespace(id=channel_id - 2)))
+
+    start = time.perf_counter()
+    gv.STORE.load()
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    restored = card.restore_cards()
+    restore_seconds = time.perf_counter() - start
+
+    gv.STORE.close()
+
+    return load_seconds, restore_seconds, restored, len(gv.TIMERS.pending())
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Time the recovery of stored rises.")
+    parser.add_argument("--rises", type=int, default=10000, help="the stored rises")
+    parser.add_argument("--players", type=int, default=5, help="the players of each rise")
+    options = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="rise_up_restore_")
+
+    try:
+        card_upsert, player_upsert = seed_store(os.path.join(data_dir, "rises.db"), options.rises, options.players)
+        load_seconds, restore_seconds, restored, timers = asyncio.run(restore(data_dir))
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    print(f"{options.rises} rises of {options.players} players")
+    print(f"card upsert      {card_upsert * 1e6:8.1f}us")
+    print(f"player upsert    {player_upsert * 1e6:8.1f}us")
+    print(f"store load       {load_seconds * 1000:8.1f}ms")
+    print(f"restore_cards()  {restore_seconds * 1000:8.1f}ms, {restored} rises restored, "
+          f"{timers} timers armed")
+
+    return 0 if restored == options.rises else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,213 @@
+"""Script measuring how long /rise up takes to post a card and
+find the posted message, against a stubbed Discord transport
+with fixed latencies.
+
+The slash command response returns no message. The card takes
+it from the gateway event announcing it, and only scans the
+channel history if no event arrives in time. Both paths are
+timed, and a burst of concurrent rises in one channel checks
+that every card finds its own message.
+
+Usage:
+    python scripts/bench_rise_up.py [--rises N] [--burst N]
+"""
+
+from typing import List
+import argparse
+import asyncio
+import datetime
+import itertools
+import logging
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import global_vars as gv
+
+
+# Latencies of the stubbed transport, in seconds
+SEND_LATENCY = 0.080
+EVENT_DELAY = 0.020
+HISTORY_PAGE_LATENCY = 0.150
+UPLOAD_LATENCY = 0.080
+
+GUILD_ID = 9
+CHANNEL_ID = 5
+BOT = SimpleNamespace(id=1, name="rise up", bot=True)
+
+_message_ids = itertools.count(1000)
+
+
+class StubMessage:
+    """A posted message."""
+
+    def __init__(self, channel, content: str):
+        self.id = next(_message_ids)
+        self.channel = channel
+        self.content = content
+        self.author = BOT
+
+    async def add_reaction(self, emoji: str):
+        await asyncio.sleep(SEND_LATENCY)
+
+
+class StubChannel:
+    """A channel keeping its messages, announcing each one on the
+    gateway after a delay when events are on.
+    """
+
+    def __init__(self, events: bool):
+        self.id = CHANNEL_ID
+        self.guild = SimpleNamespace(id=GUILD_ID)
+        self.events = events
+        self.messages: List[StubMessage] = []
+
+    def post(self, content: str) -> StubMessage:
+        message = StubMessage(self, content)
+        self.messages.append(message)
+
+        if self.events:
+            asyncio.get_event_loop().call_later(EVENT_DELAY, gv.PENDING_MESSAGES.resolve, message)
+
+        return message
+
+    async def send(self, content: str) -> StubMessage:
+        await asyncio.sleep(SEND_LATENCY)
+        return self.post(content)
+
+    async def history(self, limit: int):
+        await asyncio.sleep(HISTORY_PAGE_LATENCY)
+
+        for message in reversed(self.messages[-limit:]):
+            yield message
+
+
+class StubContext:
+    """A slash command context whose response returns no message."""
+
+    def __init__(self, channel: StubChannel):
+        self.channel = channel
+
+    async def send(self, content: str = None, send_type: int = 4):
+        await asyncio.sleep(SEND_LATENCY)
+        self.channel.post(content)
+
+
+def configure(channel: StubChannel) -> None:
+    """Point the bot's globals at the stubbed transport."""
+    from pending_messages import PendingMessages
+    from timezones import get_zone
+
+    gv.PROPERTIES = {
+        "image_mode": "cache_channel", "close_rise_delay": 10800, "message_event_timeout": 1,
+        "render_cache_size": 8, "reminder_offsets": [0], "reaction_reconcile_interval": 900
+    }
+    gv.TIMEZONE = get_zone("UTC")
+    gv.PENDING_MESSAGES = PendingMessages()
+    gv.GUILD_CONFIG = {str(GUILD_ID): {"rise_up_channel": CHANNEL_ID}}
+    gv.CLIENT = SimpleNamespace(user=BOT, get_channel=lambda channel_id: channel)
+    gv.STORE = SimpleNamespace(save_card=lambda card: None, save_cache_images=lambda card: None)
+    gv.CARDS = {}
+    gv.CARD_MESSAGES = {}
+
+
+def create_card(channel: StubChannel, author_id: int):
+    """Return a card whose avatars and image upload are stubbed."""
+    import card
+
+    author = SimpleNamespace(id=author_id, name=f"author {author_id}", avatar=None)
+    target_time = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)
+    rise = card.Card(target_time=target_time, game=card.Game(name="Valorant", img_path=""), slots=5,
+                     author=author, channel=channel, ctx=StubContext(channel))
+
+    async def fetch_avatars():
+        pass
+
+    async def upload(data):
+        await asyncio.sleep(UPLOAD_LATENCY)
+        return f"https://cdn.example/attachments/{author_id}/card.jpg"
+
+    rise.fetch_avatars = fetch_avatars
+    rise.upload = upload
+
+    return rise
+
+
+async def time_responses(events: bool, rises: int) -> List[float]:
+    """Return the seconds from sending each card's response to
+    having its message, one rise at a time.
+    """
+
+    channel = StubChannel(events)
+    configure(channel)
+
+    # Without events, the card searches the history straight away
+    if not events:
+        gv.PROPERTIES["message_event_timeout"] = 0
+
+    timings = []
+
+    for author_id in range(rises):
+        rise = create_card(channel, author_id)
+        url = await rise.upload(None)
+
+        start = time.perf_counter()
+        message = await rise.post_response(url)
+        timings.append(time.perf_counter() - start)
+
+        assert message.content == url
+
+    return timings
+
+
+async def run_burst(rises: int) -> tuple:
+    """Start rises concurrently in one channel. Return the seconds
+    taken and the number of cards holding their own message.
+    """
+
+    channel = StubChannel(events=True)
+    configure(channel)
+    cards = [create_card(channel, author_id) for author_id in range(rises)]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(rise.send() for rise in cards))
+    elapsed = time.perf_counter() - start
+
+    own = sum(1 for rise in cards
+              if rise.message.content.endswith(f"/{rise.author.id}/card.jpg")
+              and gv.CARD_MESSAGES[str(rise.message.id)] == str(rise.author.id))
+
+    return elapsed, own
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Time the posting of rise up cards.")
+    parser.add_argument("--rises", type=int, default=20, help="the rises timed one at a time")
+    parser.add_argument("--burst", type=int, default=50, help="the rises started together")
+    options = parser.parse_args()
+
+    # The history scan is expected, its warnings are left out
+    logging.basicConfig(level=logging.ERROR)
+
+    print(f"send {SEND_LATENCY * 1000:.0f}ms, event {EVENT_DELAY * 1000:.0f}ms after the send, "
+          f"history page {HISTORY_PAGE_LATENCY * 1000:.0f}ms")
+
+    for name, events in (("gateway event", True), ("history scan", False)):
+        timings = asyncio.run(time_responses(events, options.rises))
+        print(f"{name:>14}: response to message {statistics.median(timings) * 1000:6.1f}ms median, "
+              f"{max(timings) * 1000:6.1f}ms max")
+
+    elapsed, own = asyncio.run(run_burst(options.burst))
+    print(f"{options.burst} concurrent rises posted in {elapsed * 1000:.0f}ms, "
+          f"{own}/{options.burst} holding their own message")
+
+    return 0 if own == options.burst else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
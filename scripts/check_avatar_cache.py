@@ -0,0 +1,153 @@
+"""Script checking the avatar cache against a local stand-in of
+the avatar CDN, served with aiohttp.
+
+The stand-in serves a generated PNG of the requested size for
+every avatar, after a short delay so that concurrent fetches
+overlap, and counts the requests it receives.
+
+Usage:
+    python scripts/check_avatar_cache.py
+"""
+
+from typing import List
+import asyncio
+import io
+import logging
+import os
+import sys
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from aiohttp import web
+from PIL import Image
+
+from avatar_cache import AvatarCache
+
+
+USER_ID = 1234
+OTHER_USER_ID = 12345
+AVATAR_SIZE = 92
+PLAYER_AVATAR_SIZE = 25
+RESPONSE_DELAY = 0.05
+MISSING_AVATAR = "missing"
+
+
+class AvatarServer:
+    """A stand-in of the avatar CDN.
+
+    Instance Attributes:
+        - requests: the path and size of every request received
+    """
+
+    def __init__(self):
+        self.requests = []
+        self._runner = None
+        self.url = None
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/avatars/{user_id}/{avatar}.png", self._handle)
+
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", 0).start()
+
+        host, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}"
+
+    async def stop(self) -> None:
+        await self._runner.cleanup()
+
+    async def _handle(self, request):
+        size = int(request.query["size"])
+        self.requests.append((request.path, size))
+        await asyncio.sleep(RESPONSE_DELAY)
+
+        if request.match_info["avatar"] == MISSING_AVATAR:
+            raise web.HTTPNotFound()
+
+        output = io.BytesIO()
+        Image.new("RGBA", (size, size), (200, 50, 50, 255)).save(output, format="PNG")
+
+        return web.Response(body=output.getvalue(), content_type="image/png")
+
+
+async def run_checks(directory: str) -> List[str]:
+    """Run every check and return the names of the failed ones."""
+
+    server = AvatarServer()
+    await server.start()
+    failures = []
+
+    def check(name: str, condition: bool):
+        print(f"{'ok' if condition else 'FAIL':>4} {name}")
+
+        if not condition:
+            failures.append(name)
+
+    cache = AvatarCache(directory, max_memory=2, base_url=server.url)
+
+    # Concurrent renders of a card share one download
+    paths = await asyncio.gather(*(cache.fetch(USER_ID, "a1", AVATAR_SIZE) for _ in range(10)))
+    check("concurrent fetches share one download", len(server.requests) == 1)
+    check("every fetch gets the same path", len(set(paths)) == 1 and paths[0] is not None)
+    check("the CDN is asked for the next power of two",
+          server.requests[0] == (f"/avatars/{USER_ID}/a1.png", 128))
+
+    with Image.open(paths[0]) as image:
+        check("the stored image is downscaled to the displayed size", image.size == (AVATAR_SIZE, AVATAR_SIZE))
+
+    await cache.fetch(USER_ID, "a1", AVATAR_SIZE)
+    check("a cached avatar is not downloaded again", len(server.requests) == 1)
+    check("a cached avatar is read from memory", cache.load(paths[0]) is not None)
+
+    small = await cache.fetch(USER_ID, "a1", PLAYER_AVATAR_SIZE)
+    check("each displayed size is downloaded once", len(server.requests) == 2)
+
+    # A new avatar replaces the images of the previous one, size by size
+    updated = await cache.fetch(USER_ID, "a2", AVATAR_SIZE)
+    check("the previous avatar of a user is removed", not os.path.exists(paths[0]) and not cache.contains(paths[0]))
+    check("the new avatar is stored", os.path.exists(updated) and cache.contains(updated))
+    check("the other sizes of the previous avatar are kept", os.path.exists(small))
+
+    other = await cache.fetch(OTHER_USER_ID, "b1", AVATAR_SIZE)
+    check("users sharing an id prefix keep their avatars", os.path.exists(updated) and os.path.exists(other))
+    check("the memory tier is bounded", len(cache._memory) <= cache.max_memory)
+
+    before = len(server.requests)
+    check("a missing avatar is not cached", await cache.fetch(USER_ID, MISSING_AVATAR, AVATAR_SIZE) is None)
+    check("a default avatar is never downloaded",
+          await cache.fetch(USER_ID, None, AVATAR_SIZE) is None and len(server.requests) == before + 1)
+
+    await cache.close()
+    check("closing the cache closes its session", cache._session is None)
+
+    # A restarted bot finds the avatars on disk
+    restarted = AvatarCache(directory, base_url=server.url)
+    check("the disk tier is indexed on startup", restarted.contains(updated) and restarted.contains(other))
+    check("a disk tier hit is read without a download",
+          restarted.load(updated) is not None and await restarted.fetch(USER_ID, "a2", AVATAR_SIZE) == updated
+          and len(server.requests) == before + 1)
+
+    await restarted.close()
+    await server.stop()
+
+    return failures
+
+
+def main() -> int:
+    # The missing avatar is expected, its warning is left out
+    logging.basicConfig(level=logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as directory:
+        failures = asyncio.run(run_checks(directory))
+
+    print(f"{len(failures)} failed")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
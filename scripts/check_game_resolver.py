@@ -0,0 +1,194 @@
+"""Script checking how game names are resolved against games.json,
+both the names that must resolve to a game and the unknown titles
+that must not be mistaken for one.
+
+Then times the resolver against a generated catalogue of several
+thousand titles, for every kind of query: exact names and aliases,
+prefixes, misspellings, unknown titles close to catalogue titles
+(fuzzy misses) and unknown titles sharing no trigram with any of
+them (trigram misses).
+
+Usage:
+    python scripts/check_game_resolver.py [--catalogue N] [--seed N]
+"""
+
+from typing import Callable, Dict, List
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from game_resolver import GameResolver
+
+
+# Queries and the name of the game they resolve to
+RESOLVED = {
+    "csgo": "CS:GO",
+    "cs:go": "CS:GO",
+    "csg": "CS:GO",
+    "the forest": "The Forest",
+    "for": "The Forest",
+    "valorent": "Valorant",
+    "valo": "Valorant",
+    "bed wars": "Bedwars",
+    "amoung us": "Among Us",
+    "leage": "League",
+    "gree": "Green Hell",
+}
+
+# Unknown games, which keep the typed name and get no image
+UNKNOWN = [
+    "Fortnite",
+    "Forza",
+    "For Honor",
+    "Rocket League",
+    "League of Legends",
+    "Among Trees",
+    "CS2",
+    "c",
+]
+
+
+WORDS = [
+    "ancient", "arena", "battle", "blade", "castle", "city", "clash", "cosmic", "crown", "dark",
+    "dawn", "desert", "dragon", "dungeon", "empire", "eternal", "fallen", "farm", "fleet", "frontier",
+    "galaxy", "ghost", "hero", "horizon", "island", "kingdom", "knight", "legend", "light", "lost",
+    "machine", "mountain", "mystic", "night", "ocean", "outlaw", "planet", "quest", "racer", "rebel",
+    "river", "rogue", "saga", "shadow", "siege", "sky", "space", "star", "steel", "storm",
+    "survivor", "tactics", "titan", "tower", "valley", "village", "warrior", "wild", "winter", "world"
+]
+
+# Words of no catalogue title, replacing one word of a title in fuzzy misses
+OTHER_WORDS = ["harvest", "pirate", "orbit", "jungle", "raid", "frost", "canyon", "voyage", "temple", "nomad"]
+
+
+def get_catalogue(rng: random.Random, size: int) -> Dict[str, dict]:
+    """Return a games dictionary of size generated titles, each
+    under its normalized name and the initials of its words.
+    """
+
+    games = {}
+    titles = set()
+
+    while len(titles) < size:
+        words = rng.sample(WORDS, rng.randint(2, 3))
+
+        if rng.random() < 0.3:
+            words.append(str(rng.randint(2, 9)))
+
+        titles.add(" ".join(word.capitalize() for word in words))
+
+    for title in sorted(titles):
+        game = {"name": title, "img": f"assets/background/{title}.png"}
+        games.setdefault(title.lower(), game)
+        games.setdefault("".join(word[0] for word in title.lower().split()), game)
+
+    return games
+
+
+def misspell(rng: random.Random, title: str) -> str:
+    """Return title with two adjacent letters of a word swapped."""
+
+    words = title.split()
+    index = max(range(len(words)), key=lambda i: len(words[i]))
+    word = words[index]
+    i = rng.randrange(len(word) - 1)
+    words[index] = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+    return " ".join(words)
+
+
+def get_queries(rng: random.Random, games: Dict[str, dict], count: int) -> Dict[str, List[str]]:
+    """Return count queries of each kind against the catalogue."""
+
+    names = sorted({game["name"] for game in games.values()})
+    aliases = sorted(alias for alias in games if " " not in alias)
+    sample = [rng.choice(names) for _ in range(count)]
+
+    return {
+        "exact name": sample,
+        "exact alias": [rng.choice(aliases) for _ in range(count)],
+        "prefix": [name[:max(4, len(name) * 2 // 3)] for name in sample],
+        "misspelling": [misspell(rng, name) for name in sample],
+        "fuzzy miss": [name.rsplit(" ", 1)[0] + " " + rng.choice(OTHER_WORDS) for name in sample],
+        "trigram miss": ["".join(rng.choice("qxzjv") for _ in range(rng.randint(6, 12))) for _ in range(count)]
+    }
+
+
+def time_queries(resolve: Callable, queries: List[str], repeat: int = 5) -> float:
+    """Return the best time of resolving every query, in seconds per query."""
+
+    best = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+
+        for query in queries:
+            resolve(query)
+
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best / len(queries)
+
+
+def run_benchmarks(size: int, seed: int, count: int = 500) -> None:
+    """Print the time of building an index over a generated
+    catalogue and of resolving each kind of query with it.
+    """
+
+    rng = random.Random(seed)
+    games = get_catalogue(rng, size)
+
+    start = time.perf_counter()
+    resolver = GameResolver(games)
+    build = time.perf_counter() - start
+
+    print(f"catalogue of {size} titles, {len(resolver)} keys, index built in {build * 1000:.0f}ms")
+
+    for kind, queries in get_queries(rng, games, count).items():
+        seconds = time_queries(resolver.resolve, queries)
+        resolved = sum(resolver.resolve(query) is not None for query in queries)
+        print(f"{kind:>14} {seconds * 1e6:7.1f}us per query, {resolved}/{len(queries)} resolved")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check and time the game name resolver.")
+    parser.add_argument("--catalogue", type=int, default=5000, help="the titles of the generated catalogue")
+    parser.add_argument("--seed", type=int, default=0, help="the seed of the generated catalogue")
+    options = parser.parse_args()
+
+    with open(os.path.join(ROOT_DIR, "games.json")) as f:
+        resolver = GameResolver(json.load(f))
+
+    failures = 0
+
+    for query, expected in RESOLVED.items():
+        game = resolver.resolve(query)
+        name = game[0] if game is not None else None
+
+        if name != expected:
+            print(f"FAIL {query!r} resolved to {name!r}, expected {expected!r}")
+            failures += 1
+
+    for query in UNKNOWN:
+        game = resolver.resolve(query)
+
+        if game is not None:
+            print(f"FAIL {query!r} resolved to {game[0]!r}, expected an unknown game")
+            failures += 1
+
+    print(f"{len(RESOLVED) + len(UNKNOWN) - failures}/{len(RESOLVED) + len(UNKNOWN)} queries resolved as expected")
+
+    run_benchmarks(options.catalogue, options.seed)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
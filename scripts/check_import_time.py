@@ -0,0 +1,95 @@
+"""Script measuring the cold import time of the bot's modules,
+each in a fresh interpreter, and checking that importing them
+builds none of the configured globals.
+
+The import runs from an empty directory, so it fails if it reads
+properties.json or games.json. The time of the module itself is
+taken from python -X importtime, best of several runs.
+
+Usage:
+    python scripts/check_import_time.py [--runs N] [module ...]
+"""
+
+from typing import Dict, List
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+MODULES = ["global_vars", "rise_up", "card"]
+
+# The network libraries, only imported once the client or a session is built
+FORBIDDEN_MODULES = ["discord", "discord_slash", "aiohttp"]
+
+PROBE = """
+import sys
+import {module}
+import global_vars as gv
+
+print("modules", *[name for name in {forbidden!r} if name in sys.modules])
+print("globals", *sorted(gv.APP.__dict__.keys() - {{"root_dir"}}))
+"""
+
+
+def import_module(module: str, cwd: str) -> Dict:
+    """Import a module in a fresh interpreter and return its
+    cumulative import time in microseconds, and what it loaded.
+    """
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT_DIR, os.environ.get("PYTHONPATH")])))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                             PROBE.format(module=module, forbidden=FORBIDDEN_MODULES)],
+                            cwd=cwd, env=env, capture_output=True, text=True)
+
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr}")
+
+    cumulative = None
+
+    # Lines look like: import time:  self [us] | cumulative | imported package
+    for line in result.stderr.splitlines():
+        fields = [field.strip() for field in line.split(":", 1)[-1].split("|")]
+
+        if len(fields) == 3 and fields[2] == module:
+            cumulative = int(fields[1])
+
+    output = dict(line.split(" ", 1) if " " in line else (line, "") for line in result.stdout.splitlines())
+
+    return {"microseconds": cumulative, "modules": output["modules"].split(),
+            "globals": output["globals"].split()}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure the cold import time of the bot's modules.")
+    parser.add_argument("--runs", type=int, default=5, help="the imports timed per module")
+    parser.add_argument("modules", nargs="*", default=MODULES, help="the modules to import")
+    options = parser.parse_args()
+
+    failures: List[str] = []
+
+    with tempfile.TemporaryDirectory() as cwd:
+        for module in options.modules:
+            runs = [import_module(module, cwd) for _ in range(options.runs)]
+            best = min(run["microseconds"] for run in runs)
+            loaded = runs[0]["modules"]
+            built = runs[0]["globals"]
+
+            print(f"{module:>12} {best / 1000:7.1f}ms"
+                  f"{'' if not loaded else ', imported ' + ', '.join(loaded)}"
+                  f"{'' if not built else ', built ' + ', '.join(built)}")
+
+            if loaded or built:
+                failures.append(module)
+
+    for module in failures:
+        print(f"FAIL importing {module} loads a network library or builds a global")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,190 @@
+"""Script checking request_commands.py against a local stand-in
+of the Discord application commands endpoint.
+
+The stand-in echoes registered commands back the way Discord
+does: with an id, an application id and a version, with the
+type of chat input commands filled in, and with empty options
+and false flags left out.
+
+Usage:
+    python scripts/check_request_commands.py
+"""
+
+from typing import List
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import copy
+import json
+import os
+import sys
+import threading
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from request_commands import COMMANDS, CommandClient, sync_commands
+
+
+APPLICATION_ID = "1000"
+
+
+def echo_command(command: dict, command_id: str) -> dict:
+    """Return a command as Discord returns it once registered."""
+
+    def echo_option(option: dict) -> dict:
+        option = {key: value for key, value in option.items() if value not in (False, [], None)}
+
+        if "options" in option:
+            option["options"] = [echo_option(o) for o in option["options"]]
+
+        return option
+
+    registered = echo_option(command)
+    registered.update(id=command_id, application_id=APPLICATION_ID, version=command_id,
+                      default_permission=True)
+    registered.setdefault("type", 1)
+
+    return registered
+
+
+class CommandServer(ThreadingHTTPServer):
+    """A stand-in of the commands endpoint, recording its requests.
+
+    Instance Attributes:
+        - commands: the registered commands, by name
+        - requests: the method of every request received
+        - reject_overwrite: whether bulk overwrites fail with a 405
+    """
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), CommandHandler)
+
+        self.commands = {}
+        self.requests = []
+        self.reject_overwrite = False
+        self._next_id = 1
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/applications/{APPLICATION_ID}/commands"
+
+    def register(self, command: dict) -> dict:
+        """Register a command, replacing the one with its name."""
+
+        existing = self.commands.get(command["name"])
+        command_id = existing["id"] if existing is not None else str(self._next_id)
+        self._next_id += 1
+
+        self.commands[command["name"]] = echo_command(command, command_id)
+        return self.commands[command["name"]]
+
+
+class CommandHandler(BaseHTTPRequestHandler):
+    """Answers the requests of a CommandServer."""
+
+    server: CommandServer
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status: int, body=None):
+        data = json.dumps(body).encode() if body is not None else b""
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_body(self):
+        return json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+    def do_GET(self):
+        self.server.requests.append("GET")
+        self.reply(200, list(self.server.commands.values()))
+
+    def do_PUT(self):
+        self.server.requests.append("PUT")
+        commands = self.read_body()
+
+        if self.server.reject_overwrite:
+            return self.reply(405, {"message": "405: Method Not Allowed"})
+
+        registered = dict(self.server.commands)
+        self.server.commands = {}
+
+        for command in commands:
+            # Overwriting keeps the ids of commands that already exist
+            if command["name"] in registered:
+                self.server.commands[command["name"]] = registered[command["name"]]
+
+            self.server.register(command)
+
+        self.reply(200, list(self.server.commands.values()))
+
+    def do_POST(self):
+        self.server.requests.append("POST")
+        self.reply(200, self.server.register(self.read_body()))
+
+    def do_DELETE(self):
+        self.server.requests.append("DELETE")
+        command_id = self.path.rsplit("/", 1)[1]
+        self.server.commands = {name: command for name, command in self.server.commands.items()
+                                if command["id"] != command_id}
+        self.reply(204)
+
+
+def main() -> int:
+    server = CommandServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = CommandClient(server.url, "token")
+    failures: List[str] = []
+
+    def check(name: str, condition: bool):
+        print(f"{'ok' if condition else 'FAIL':>4} {name}")
+
+        if not condition:
+            failures.append(name)
+
+    def run(commands=COMMANDS, dry_run=False):
+        server.requests.clear()
+        changes = sync_commands(client, commands, dry_run=dry_run)
+        return changes, list(server.requests)
+
+    changes, requests = run(dry_run=True)
+    check("a dry run only reads the registered commands", requests == ["GET"])
+    check("a dry run shows every command as created", len(changes["created"]) == len(COMMANDS))
+
+    changes, requests = run()
+    check("a first run writes every command in one overwrite", requests == ["GET", "PUT"])
+    check("every command is registered", set(server.commands) == {c["name"] for c in COMMANDS})
+
+    changes, requests = run()
+    check("a second run finds the echoed commands unchanged", requests == ["GET"])
+    check("a second run reports no change", not any(changes[c] for c in ("created", "updated", "deleted")))
+
+    edited = copy.deepcopy(COMMANDS)
+    edited[0]["description"] = "Call a rise up now"
+    changes, requests = run(edited)
+    check("an edited description is one update", [c["name"] for c in changes["updated"]] == [edited[0]["name"]])
+    check("an update is written in one overwrite", requests == ["GET", "PUT"])
+
+    # Without bulk overwrites, only the changes are sent
+    server.reject_overwrite = True
+    server.register({"name": "stale", "description": "A removed command", "options": []})
+    changes, requests = run()
+    check("a failed overwrite falls back to one request per change",
+          sorted(requests) == ["DELETE", "GET", "POST", "PUT"])
+    check("the fallback leaves the defined commands registered",
+          set(server.commands) == {c["name"] for c in COMMANDS} and not changes["errors"])
+
+    changes, requests = run()
+    check("the fallback result is up to date", requests == ["GET"])
+
+    server.shutdown()
+    print(f"{len(failures)} failed")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,184 @@
+"""Script checking the time grammar of rise_up.parse_time_str with
+randomized property checks, and timing each accepted form.
+
+Every property is checked on strings generated from a seeded
+random generator, with random casing and spacing, in several
+timezones. The rejected forms must give an error and no time.
+
+Usage:
+    python scripts/check_time_parser.py [--seed N] [--examples N]
+"""
+
+from typing import Callable, List
+import argparse
+import datetime
+import os
+import random
+import sys
+import timeit
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from rise_up import parse_time_str
+from timezones import get_zone
+
+
+ZONES = ["UTC", "Asia/Tokyo", "America/Toronto", "Australia/Adelaide"]
+
+# Strings that must be rejected, whatever the timezone
+REJECTED = [
+    "13pm", ":30pm", "5:75pm", "0am", "00pm", "5:7pm", "24:00", "25:10", "17:60",
+    "in", "in 200h", "in 10081m", "tomorrow", "today at", "5", "5 30", "noonish",
+    "", "   ", "abc", "5pm tomorrow", "in -5m"
+]
+
+# One example of each accepted form, timed by the benchmark
+FORMS = {
+    "12-hour": "5pm",
+    "12-hour with minutes": "9:01 A.M.",
+    "24-hour": "17:30",
+    "relative": "in 1h30m",
+    "relative words": "in 2 hours",
+    "day word": "tomorrow at 9pm",
+    "named": "tomorrow noon",
+    "rejected": "5:75pm"
+}
+
+
+def scramble(rng: random.Random, text: str) -> str:
+    """Return text with random casing and extra whitespace,
+    which the parser must ignore.
+    """
+
+    text = "".join(c.upper() if rng.random() < 0.5 else c for c in text)
+    text = text.replace(" ", " " * rng.randint(1, 3))
+
+    return " " * rng.randint(0, 2) + text + " " * rng.randint(0, 2)
+
+
+def check_next_time(result, tz, hour: int, minute: int) -> List[str]:
+    """Return what is wrong with a time parsed without a day word."""
+
+    if result.error is not None:
+        return [result.error]
+
+    errors = []
+    now = datetime.datetime.now(tz)
+    local = result.time.astimezone(tz)
+
+    if result.time.tzinfo is None:
+        errors.append("the time is naive")
+
+    # The next occurrence, at most a day and a DST shift away
+    if not -60 <= (result.time - now).total_seconds() <= 25 * 3600:
+        errors.append(f"{result.time} is not the next occurrence after {now}")
+
+    # Wall times skipped by a DST change are shifted, the others are exact
+    if (local.hour, local.minute) != (hour, minute) and local.dst() == now.dst():
+        errors.append(f"{local:%H:%M} is not {hour:02}:{minute:02}")
+
+    return errors
+
+
+def run_checks(seed: int, examples: int) -> int:
+    """Run every property and return the number of failures."""
+
+    rng = random.Random(seed)
+    failures = 0
+    checked = 0
+
+    def report(text: str, tz, errors: List[str]):
+        nonlocal failures, checked
+        checked += 1
+
+        for error in errors:
+            print(f"FAIL {text!r} in {tz}: {error}")
+            failures += 1
+
+    for _ in range(examples):
+        tz = get_zone(rng.choice(ZONES))
+
+        # 12-hour times
+        hour, minute, meridiem = rng.randint(1, 12), rng.randint(0, 59), rng.choice(["am", "pm", "a.m.", "p"])
+        text = f"{hour}:{minute:02}{' ' * rng.randint(0, 1)}{meridiem}" if rng.random() < 0.7 \
+            else f"{hour}{meridiem}"
+        expected_minute = minute if ":" in text else 0
+        expected_hour = hour % 12 + (12 if meridiem.startswith("p") else 0)
+        report(text, tz, check_next_time(parse_time_str(scramble(rng, text), tz), tz,
+                                         expected_hour, expected_minute))
+
+        # 24-hour times
+        hour, minute = rng.randint(0, 23), rng.randint(0, 59)
+        text = f"{hour}:{minute:02}"
+        report(text, tz, check_next_time(parse_time_str(scramble(rng, text), tz), tz, hour, minute))
+
+        # Relative times are exact offsets from now
+        hours, minutes = rng.randint(0, 47), rng.randint(1, 59)
+        text = rng.choice([f"in {hours}h{minutes}m", f"in {hours} hours {minutes} mins", f"in {minutes}m"])
+        delta = datetime.timedelta(minutes=minutes) if text.startswith(f"in {minutes}m") \
+            else datetime.timedelta(hours=hours, minutes=minutes)
+        result = parse_time_str(scramble(rng, text), tz)
+        errors = [result.error] if result.error is not None else []
+
+        if result.time is not None:
+            offset = result.time - datetime.datetime.now(tz) - delta
+
+            if abs(offset.total_seconds()) > 1:
+                errors.append(f"{result.time} is {offset} away from now + {delta}")
+
+        report(text, tz, errors)
+
+        # Tomorrow is the next calendar day in the timezone
+        hour = rng.randint(0, 23)
+        text = f"tomorrow {hour}:00"
+        result = parse_time_str(scramble(rng, text), tz)
+        tomorrow = datetime.datetime.now(tz).date() + datetime.timedelta(days=1)
+        errors = [result.error] if result.error is not None else []
+
+        if result.time is not None and result.time.astimezone(tz).date() != tomorrow:
+            errors.append(f"{result.time} is not on {tomorrow}")
+
+        report(text, tz, errors)
+
+        # Rejected forms give an error and never a time
+        text = rng.choice(REJECTED)
+        result = parse_time_str(scramble(rng, text), tz)
+        report(text, tz, [] if result.error is not None and result.time is None
+                         else [f"accepted as {result.time}"])
+
+    for text in REJECTED:
+        result = parse_time_str(text, get_zone("UTC"))
+        report(text, "UTC", [] if result.error is not None and result.time is None
+                            else [f"accepted as {result.time}"])
+
+    print(f"{checked - failures}/{checked} generated strings parsed as expected (seed {seed})")
+
+    return failures
+
+
+def run_benchmarks(number: int = 20000) -> None:
+    """Print the time of a parse of each form."""
+
+    tz = get_zone("America/Toronto")
+
+    for form, text in FORMS.items():
+        parse: Callable = lambda: parse_time_str(text, tz)
+        seconds = min(timeit.repeat(parse, number=number, repeat=3)) / number
+        print(f"{form:>22} {text!r:>18} {seconds * 1e6:6.1f}us")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check and time the time string grammar.")
+    parser.add_argument("--seed", type=int, default=random.randrange(1 << 32))
+    parser.add_argument("--examples", type=int, default=2000)
+    options = parser.parse_args()
+
+    failures = run_checks(options.seed, options.examples)
+    run_benchmarks()
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,282 @@
+"""Script running the bot's rise handling as a cluster of shard
+workers against a stub Discord client, to check that the guilds
+are partitioned between the workers and to measure how reaction
+throughput scales with the number of workers.
+
+Every worker is a process of its own, like the workers of
+launcher.py, given its shard range through the same environment
+variables. The workers share one SQLite store, seeded with a rise
+per guild. Each worker:
+    - restores the rises of its own guilds only
+    - arms the timers of those rises only
+    - handles a burst of reactions on its rises, each published as
+      a render and an attachment edit through the stub client
+
+Usage:
+    python scripts/shard_harness.py [--guilds N] [--shards S]
+                                    [--processes 1,2,4] [--events E]
+"""
+
+from typing import Dict, List
+import argparse
+import asyncio
+import datetime
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from launcher import get_shard_ranges
+from sharding import SHARD_COUNT_VARIABLE, SHARD_IDS_VARIABLE, shard_for_guild
+
+
+EMOJIS = ("✅", "\U0001F374")
+
+
+def get_guild_id(index: int) -> int:
+    """Return a snowflake-like guild id, spreading the guilds
+    evenly over the shards.
+    """
+    return ((index + 1) << 22) | index
+
+
+def seed_store(path: str, guilds: int) -> None:
+    """Store one rise per guild, an hour from now."""
+    from rise_store import RiseStore
+
+    store = RiseStore(path)
+    target = time.time() + 3600
+
+    for index in range(guilds):
+        guild_id = get_guild_id(index)
+        card = SimpleNamespace(
+            message=SimpleNamespace(id=guild_id + 1), guild=SimpleNamespace(id=guild_id),
+            channel=SimpleNamespace(id=guild_id + 2), forwarded_message=None,
+            author=SimpleNamespace(id=index + 1, name=f"author {index}", avatar=None),
+            game=SimpleNamespace(name="Valorant", img_path="assets/background/Valorant.png"), slots=5,
+            target_time=datetime.datetime.fromtimestamp(target, datetime.timezone.utc),
+            get_notify_at=lambda: target, get_close_at=lambda: target + 10800)
+        store.save_card(card)
+
+    store.close()
+
+
+class StubHTTP:
+    """The REST calls a card makes, answered without a network."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def request(self, route, **kwargs):
+        self.calls += 1
+        return {"attachments": [{"url": f"https://cdn.example/{route.path}/card.png"}]}
+
+    async def edit_message(self, channel_id, message_id, **fields):
+        self.calls += 1
+
+    async def remove_reaction(self, channel_id, message_id, emoji, member_id):
+        self.calls += 1
+
+
+class StubChannel:
+    """A channel of a guild, whose messages have no reactions yet."""
+
+    def __init__(self, http: StubHTTP, channel_id: int):
+        self.http = http
+        self.id = channel_id
+        self.guild = SimpleNamespace(id=channel_id - 2)
+
+    async def fetch_message(self, message_id: int):
+        self.http.calls += 1
+        return SimpleNamespace(id=message_id, channel=self, reactions=[])
+
+
+class StubClient:
+    """A client knowing every channel, each in the guild its id was derived from."""
+
+    def __init__(self):
+        self.http = StubHTTP()
+        self.user = SimpleNamespace(id=0)
+
+    def get_channel(self, channel_id: int):
+        return StubChannel(self.http, channel_id)
+
+
+def run_worker(shard_ids: range, shard_count: int, data_dir: str, events: int, results) -> None:
+    """Run a worker process: restore, arm timers and handle reactions."""
+
+    os.environ[SHARD_IDS_VARIABLE] = f"{shard_ids.start}-{shard_ids.stop - 1}"
+    os.environ[SHARD_COUNT_VARIABLE] = str(shard_count)
+    os.chdir(ROOT_DIR)
+
+    import global_vars as gv
+
+    gv.APP.root_dir = data_dir
+    gv.APP.__dict__["properties"] = {
+        "timezone": "UTC", "close_rise_delay": 10800, "image_mode": "attachment",
+        "renderer": "pillow", "render_workers": 1, "render_cache_size": 8,
+        "avatar_cache_dir": "avatars", "store_path": "rises.db", "reminder_offsets": [0],
+        "update_quiet_window": 0, "update_min_interval": 0, "update_max_delay": 0,
+        "reaction_reconcile_interval": 900
+    }
+    gv.CLIENT = StubClient()
+
+    import card
+
+    async def main():
+        restored = card.restore_cards()
+        cards = list(gv.CARDS.values())
+
+        timer_guilds = [timer._callback.__self__.guild.id for _, timer in gv.TIMERS.pending()]
+
+        # Restored rises reconcile their reactions first, before the burst
+        await asyncio.gather(*(target.reconcile_reactions() for target in cards))
+
+        start = time.perf_counter()
+
+        for i in range(events):
+            target = cards[i % len(cards)]
+            user = SimpleNamespace(id=10 ** 6 + i % 50, name=f"player {i % 50}",
+                                   display_name=f"player {i % 50}", avatar=None, bot=False)
+
+            # Each pass over the rises switches the emoji, so the players swap their reactions
+            emoji = EMOJIS[(i // len(cards)) % 2]
+
+            for message, other_emoji in target.add_reaction(user, target.message.id, emoji):
+                await message.remove_reaction(other_emoji, user)
+
+            target.schedule_update()
+
+            # Reactions arrive over time, letting the scheduled updates run
+            await asyncio.sleep(0)
+
+        for target in cards:
+            await target.updates.flush()
+
+        elapsed = time.perf_counter() - start
+        gv.RENDER_POOL.shutdown()
+
+        results.put({
+            "shards": (shard_ids.start, shard_ids.stop - 1),
+            "card_guilds": sorted(c.guild.id for c in cards),
+            "timer_guilds": timer_guilds,
+            "restored": restored,
+            "events": events,
+            "rest_calls": gv.CLIENT.http.calls,
+            "seconds": elapsed
+        })
+
+    asyncio.run(main())
+
+
+def run_cluster(guilds: int, shard_count: int, processes: int, events: int) -> List[Dict]:
+    """Run the workers of a cluster over a fresh store and return their results."""
+
+    data_dir = tempfile.mkdtemp(prefix="rise_up_shards_")
+
+    try:
+        seed_store(os.path.join(data_dir, "rises.db"), guilds)
+
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        ranges = get_shard_ranges(shard_count, processes)
+
+        # Every worker handles its share of the events
+        workers = [context.Process(target=run_worker,
+                                   args=(shard_ids, shard_count, data_dir, events // len(ranges), results))
+                   for shard_ids in ranges]
+
+        for worker in workers:
+            worker.start()
+
+        reports = [results.get(timeout=600) for _ in workers]
+
+        for worker in workers:
+            worker.join()
+
+        return reports
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def check_partition(reports: List[Dict], guilds: int, shard_count: int) -> List[str]:
+    """Return the partitioning errors of a cluster run."""
+
+    errors = []
+    seen = set()
+
+    for report in reports:
+        first, last = report["shards"]
+        owned = {guild_id for guild_id in report["card_guilds"]
+                 if first <= shard_for_guild(guild_id, shard_count) <= last}
+
+        if len(owned) != len(report["card_guilds"]):
+            errors.append(f"shards {first}-{last} restored cards of other shards")
+
+        if any(not first <= shard_for_guild(g, shard_count) <= last for g in report["timer_guilds"]):
+            errors.append(f"shards {first}-{last} armed timers of other shards")
+
+        # A notification, a close and a reconciliation timer per card
+        if len(report["timer_guilds"]) != 3 * report["restored"]:
+            errors.append(f"shards {first}-{last} armed {len(report['timer_guilds'])} timers "
+                          f"for {report['restored']} cards")
+
+        if seen & owned:
+            errors.append(f"shards {first}-{last} restored cards restored by another worker")
+
+        seen |= owned
+
+    if len(seen) != guilds:
+        errors.append(f"{guilds - len(seen)} guilds were restored by no worker")
+
+    return errors
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the bot's rise handling as a cluster of stub shards.")
+    parser.add_argument("--guilds", type=int, default=400, help="the number of guilds, one rise each")
+    parser.add_argument("--shards", type=int, default=8, help="the total number of shards")
+    parser.add_argument("--processes", default="1,2,4", help="the worker counts to measure")
+    parser.add_argument("--events", type=int, default=2000, help="the reactions handled by the cluster")
+    options = parser.parse_args()
+
+    print(f"{options.guilds} guilds, {options.shards} shards, {options.events} reactions, "
+          f"{os.cpu_count()} cores")
+    print(f"{'processes':>9} {'restored':>17} {'timers':>7} {'REST calls':>10} {'seconds':>8} "
+          f"{'events/s':>9} {'speedup':>8}")
+
+    baseline = None
+    failed = False
+
+    for processes in (int(count) for count in options.processes.split(",")):
+        reports = run_cluster(options.guilds, options.shards, processes, options.events)
+        errors = check_partition(reports, options.guilds, options.shards)
+
+        # The workers run side by side, so the cluster is as fast as its slowest worker
+        seconds = max(report["seconds"] for report in reports)
+        throughput = sum(report["events"] for report in reports) / seconds
+        baseline = baseline or throughput
+
+        restored = "/".join(str(report["restored"]) for report in reports)
+        timers = sum(len(report["timer_guilds"]) for report in reports)
+        calls = sum(report["rest_calls"] for report in reports)
+
+        print(f"{len(reports):>9} {restored:>17} {timers:>7} {calls:>10} {seconds:>8.2f} "
+              f"{throughput:>9.0f} {throughput / baseline:>7.2f}x")
+
+        for error in errors:
+            print(f"FAIL {error}")
+
+        failed = failed or bool(errors)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,109 @@
+"""Module containing the sharding configuration of the bot.
+
+A bot process connects the shards in its shard range, and only
+handles the guilds of those shards. The range is given by the
+RISE_UP_SHARD_IDS and RISE_UP_SHARD_COUNT environment variables,
+which launcher.py sets for each of its workers, or by the
+shard_count property for a single process running every shard.
+
+Without either, the bot runs unsharded as a single process.
+"""
+
+from typing import List, Mapping, Optional
+from dataclasses import dataclass
+import os
+
+
+SHARD_IDS_VARIABLE = "RISE_UP_SHARD_IDS"
+SHARD_COUNT_VARIABLE = "RISE_UP_SHARD_COUNT"
+
+
+def shard_for_guild(guild_id: int, shard_count: int) -> int:
+    """Return the id of the shard Discord delivers the events
+    of a guild to.
+    """
+    return (int(guild_id) >> 22) % shard_count
+
+
+def parse_shard_ids(shard_ids: str) -> List[int]:
+    """Return the shard ids of a range like "0-3", a list
+    like "0,2,5", or a mix of both like "0-3,8".
+
+    Raise ValueError if shard_ids is malformed.
+    """
+
+    ids = []
+
+    for part in shard_ids.split(","):
+        first, _, last = part.strip().partition("-")
+        ids += range(int(first), int(last or first) + 1)
+
+    return sorted(set(ids))
+
+
+@dataclass(frozen=True)
+class ShardConfig:
+    """The shards run by this process.
+
+    Instance Attributes:
+        - shard_ids: the ids of the shards of this process, or
+          None to run every shard
+        - shard_count: the total number of shards, or None
+          if the bot is not sharded
+    """
+    shard_ids: Optional[List[int]] = None
+    shard_count: Optional[int] = None
+
+    @property
+    def sharded(self) -> bool:
+        """Return whether the bot is sharded."""
+        return self.shard_count is not None
+
+    @property
+    def label(self) -> str:
+        """Return a name for the shard range of this process,
+        used to keep the files of the workers apart.
+        """
+
+        if self.shard_ids is None:
+            return "all"
+
+        first, last = self.shard_ids[0], self.shard_ids[-1]
+
+        if last - first + 1 == len(self.shard_ids):
+            return f"{first}-{last}"
+
+        return "_".join(str(shard_id) for shard_id in self.shard_ids)
+
+    def owns_guild(self, guild_id: int) -> bool:
+        """Return whether the events of a guild are handled
+        by this process.
+        """
+
+        if self.shard_count is None or self.shard_ids is None:
+            return True
+
+        return shard_for_guild(guild_id, self.shard_count) in self.shard_ids
+
+
+def get_shard_config(properties: dict, environ: Mapping[str, str] = os.environ) -> ShardConfig:
+    """Return the shard configuration of this process from the
+    environment, falling back to the bot properties.
+    """
+
+    shard_count = environ.get(SHARD_COUNT_VARIABLE) or properties.get("shard_count")
+
+    if not shard_count:
+        return ShardConfig()
+
+    shard_ids = environ.get(SHARD_IDS_VARIABLE)
+
+    if shard_ids is None:
+        return ShardConfig(shard_count=int(shard_count))
+
+    ids = parse_shard_ids(shard_ids)
+
+    if ids[0] < 0 or ids[-1] >= int(shard_count):
+        raise ValueError(f"Shards {shard_ids} are outside of a shard count of {shard_count}")
+
+    return ShardConfig(shard_ids=ids, shard_count=int(shard_count))
@@ -0,0 +1,59 @@
+"""Module containing the Template class. A template is parsed
+once into literal segments and named slots, and is filled in a
+single pass with HTML escaped values.
+
+Slots are written as |slot_name| in the template source.
+"""
+
+from typing import Dict, List, Tuple
+import html
+import re
+
+
+SLOT_PATTERN = re.compile(r"\|([a-z_]+)\|")
+
+
+class Template:
+    """A precompiled template.
+
+    Instance Attributes:
+        - slots: the names of the slots, in order of appearance
+    """
+    slots: Tuple[str, ...]
+
+    def __init__(self, source: str):
+        """Parse the template source"""
+
+        self._segments: List[str] = []
+        slots = []
+        position = 0
+
+        for match in SLOT_PATTERN.finditer(source):
+            self._segments.append(source[position:match.start()])
+            slots.append(match.group(1))
+            position = match.end()
+
+        self._segments.append(source[position:])
+        self.slots = tuple(slots)
+
+    @classmethod
+    def from_file(cls, path: str) -> "Template":
+        """Return the template parsed from the file at path."""
+        with open(path, "r") as f:
+            return cls(f.read())
+
+    def fill(self, values: Dict[str, str], raw: Tuple[str, ...] = ()) -> str:
+        """Return the template with every slot replaced by its value.
+
+        Values are HTML escaped unless their slot is listed in raw,
+        which is used for slots holding already rendered HTML.
+        """
+
+        parts = [self._segments[0]]
+
+        for slot, segment in zip(self.slots, self._segments[1:]):
+            value = str(values[slot])
+            parts.append(value if slot in raw else html.escape(value))
+            parts.append(segment)
+
+        return "".join(parts)
@@ -0,0 +1,146 @@
+"""Module containing the TimerScheduler class. Keeps every
+pending timer of the bot in a single min-heap that is driven by
+one event loop callback, instead of one sleeping task per timer.
+"""
+
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import itertools
+
+
+# The event loop may run a callback up to its clock resolution early
+CLOCK_TOLERANCE = 0.001
+
+
+class TimerScheduler:
+    """A min-heap of timers ordered by deadline.
+
+    A timer is any object with an async run() method. Inserting
+    and rescheduling are O(log n). Cancelled entries release
+    their timer immediately and the heap is compacted once they
+    make up most of it.
+    """
+
+    def __init__(self):
+        """Initialize the scheduler"""
+
+        self._heap: List[list] = []
+        self._entries: Dict[object, list] = {}
+        self._counter = itertools.count()
+        self._cancelled = 0
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self._wakeup_deadline = None
+
+    def __len__(self) -> int:
+        """Return the number of pending timers."""
+        return len(self._entries)
+
+    def __contains__(self, timer) -> bool:
+        """Return whether timer is pending."""
+        return timer in self._entries
+
+    def schedule(self, timer, timeout: float) -> None:
+        """Run timer in timeout seconds. A pending timer is
+        rescheduled in place.
+        """
+
+        loop = asyncio.get_event_loop()
+
+        if timer in self._entries:
+            self._discard(timer)
+
+        entry = [loop.time() + max(timeout, 0), next(self._counter), timer]
+        self._entries[timer] = entry
+        heapq.heappush(self._heap, entry)
+
+        self._arm()
+
+    def cancel(self, timer) -> bool:
+        """Cancel timer. Return whether it was pending."""
+
+        if timer not in self._entries:
+            return False
+
+        self._discard(timer)
+        self._compact()
+        self._arm()
+
+        return True
+
+    def get_remaining(self, timer) -> Optional[float]:
+        """Return the seconds until timer runs, or None
+        if it is not pending.
+        """
+
+        if timer not in self._entries:
+            return None
+
+        return self._entries[timer][0] - asyncio.get_event_loop().time()
+
+    def pending(self) -> List[Tuple[float, object]]:
+        """Return the pending timers and the seconds until
+        they run, soonest first.
+        """
+
+        now = asyncio.get_event_loop().time()
+        return [(entry[0] - now, entry[2]) for entry in sorted(self._entries.values())]
+
+    def _discard(self, timer) -> None:
+        """(PRIVATE) Remove timer from the index and release it."""
+
+        entry = self._entries.pop(timer)
+        entry[2] = None
+        self._cancelled += 1
+
+    def _compact(self) -> None:
+        """(PRIVATE) Rebuild the heap without cancelled entries
+        once they outnumber the live ones.
+        """
+
+        if self._cancelled > 64 and self._cancelled > len(self._entries):
+            self._heap = [entry for entry in self._heap if entry[2] is not None]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+
+    def _arm(self) -> None:
+        """(PRIVATE) Arm the event loop callback for the
+        earliest live deadline.
+        """
+
+        while self._heap and self._heap[0][2] is None:
+            heapq.heappop(self._heap)
+            self._cancelled -= 1
+
+        deadline = self._heap[0][0] if self._heap else None
+
+        if deadline == self._wakeup_deadline:
+            return
+
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+
+        self._wakeup_deadline = deadline
+
+        if deadline is not None:
+            self._wakeup = asyncio.get_event_loop().call_at(deadline, self._fire)
+
+    def _fire(self) -> None:
+        """(PRIVATE) Start every timer whose deadline has passed."""
+
+        self._wakeup = None
+        self._wakeup_deadline = None
+        now = asyncio.get_event_loop().time()
+
+        while self._heap and self._heap[0][0] <= now + CLOCK_TOLERANCE:
+            _, _, timer = heapq.heappop(self._heap)
+
+            if timer is None:
+                self._cancelled -= 1
+                continue
+
+            del self._entries[timer]
+            asyncio.ensure_future(timer.run())
+
+        self._arm()
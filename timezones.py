@@ -0,0 +1,65 @@
+"""Module resolving the timezones of guilds and users.
+
+A user's own timezone takes precedence over the timezone of
+their guild, which takes precedence over the default timezone
+of the bot. Zone objects are cached, so resolving a timezone
+is only a few dictionary lookups.
+"""
+
+from typing import Optional
+from functools import lru_cache
+import datetime
+import global_vars as gv
+
+try:
+    import zoneinfo
+except ImportError:
+    # Python 3.8, zoneinfo is in the standard library from 3.9
+    from backports import zoneinfo
+
+
+@lru_cache(maxsize=None)
+def get_zone(name: str) -> datetime.tzinfo:
+    """Return the zone object of an IANA timezone name,
+    like America/Toronto.
+
+    Raise ValueError if the name is not a known timezone.
+    """
+
+    try:
+        return zoneinfo.ZoneInfo(name)
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"{name} is not a known timezone.") from None
+
+
+def is_valid_zone(name: str) -> bool:
+    """Return whether name is a known timezone."""
+
+    try:
+        get_zone(name)
+    except ValueError:
+        return False
+
+    return True
+
+
+def get_timezone(guild_id=None, user_id=None) -> datetime.tzinfo:
+    """Return the timezone times given by a user in a guild
+    are interpreted in.
+    """
+
+    for config, key in ((gv.USER_CONFIG, user_id), (gv.GUILD_CONFIG, guild_id)):
+        if key is None:
+            continue
+
+        settings = config.get(key)
+
+        if settings is not None and "timezone" in settings:
+            return get_zone(settings["timezone"])
+
+    return gv.TIMEZONE
+
+
+def get_zone_name(zone: Optional[datetime.tzinfo]) -> str:
+    """Return the display name of a zone object."""
+    return getattr(zone, "key", None) or str(zone)
@@ -0,0 +1,158 @@
+"""Module containing the UpdateScheduler class. Collapses
+bursts of card update requests into a single render and edit.
+"""
+
+from typing import Awaitable, Callable, Optional
+import asyncio
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateScheduler:
+    """A class that coalesces update requests for a single card.
+
+    An update is published once no request has arrived for
+    quiet_window seconds, but never later than max_delay seconds
+    after the first request of a burst. Publishes are spaced at
+    least min_interval seconds apart. The publish callback reads
+    the card when it runs, so the latest state is always sent.
+
+    Instance Attributes:
+        - quiet_window: seconds without requests before publishing
+        - min_interval: minimum seconds between two publishes
+        - max_delay: maximum seconds a request can be held back
+    """
+    quiet_window: float
+    min_interval: float
+    max_delay: float
+
+    def __init__(self, publish: Callable[[], Awaitable[None]], quiet_window: float = 1.0,
+                 min_interval: float = 2.0, max_delay: float = 5.0):
+        """Initialize the scheduler"""
+
+        self.quiet_window = quiet_window
+        self.min_interval = min_interval
+        self.max_delay = max_delay
+
+        self._publish = publish
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Future] = None
+
+        self._dirty = False
+        self._first_request = None
+        self._last_request = 0.0
+        self._last_publish = None
+        self._stopped = False
+
+    @property
+    def pending(self) -> bool:
+        """Return whether an update is waiting to be published."""
+        return self._dirty
+
+    def request(self) -> None:
+        """Request an update. Bursts of requests are
+        merged into a single publish.
+        """
+
+        if self._stopped:
+            return
+
+        now = asyncio.get_event_loop().time()
+
+        self._dirty = True
+        self._last_request = now
+
+        if self._first_request is None:
+            self._first_request = now
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def flush(self) -> None:
+        """Publish immediately, absorbing any pending request."""
+
+        if self._stopped:
+            return
+
+        self._dirty = False
+        self._first_request = None
+
+        async with self._lock:
+            await self._do_publish()
+
+    def cancel(self) -> None:
+        """Drop any pending request and stop the scheduler."""
+
+        self._dirty = False
+        self._first_request = None
+
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+        self._task = None
+
+    async def stop(self) -> None:
+        """Stop the scheduler for good, ignoring any later request,
+        and wait for a publish in progress to finish.
+        """
+
+        self._stopped = True
+
+        # A publish in progress is not interrupted halfway through its edits
+        if not self._lock.locked():
+            self.cancel()
+
+        self._dirty = False
+        self._first_request = None
+
+        async with self._lock:
+            pass
+
+    def _next_deadline(self) -> float:
+        """(PRIVATE) Return the loop time at which the pending
+        request should be published.
+        """
+
+        deadline = min(self._last_request + self.quiet_window,
+                       self._first_request + self.max_delay)
+
+        if self._last_publish is not None:
+            deadline = max(deadline, self._last_publish + self.min_interval)
+
+        return deadline
+
+    async def _run(self) -> None:
+        """(PRIVATE) Wait for the burst to settle and publish
+        until no request is left.
+        """
+
+        loop = asyncio.get_event_loop()
+
+        while self._dirty:
+            delay = self._next_deadline() - loop.time()
+
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            async with self._lock:
+                # A flush may have published in the meantime
+                if not self._dirty:
+                    break
+
+                self._dirty = False
+                self._first_request = None
+
+                await self._do_publish()
+
+    async def _do_publish(self) -> None:
+        """(PRIVATE) Run the publish callback and record its time."""
+
+        self._last_publish = asyncio.get_event_loop().time()
+
+        try:
+            await self._publish()
+        except Exception:
+            logger.exception("scheduled card update failed")